@@ -0,0 +1,46 @@
+#Check of the 'async' eAPI collector of topoGen-python3.py against the local stand-in eAPI server (eapiStandInServer.py) and the recorded results in 'eapi-recorded'
+#lf218 is made slower than the eAPI timeout, so it must be skipped with a message naming the timeout while the other DUTs are collected at the same time
+#Run it using 'python3 TestingBlocks/asyncEapiCheck.py' from where topoGen-python3.py itself runs (it needs the same SWAT libraries to be importable)
+import importlib.util
+import logging
+import os
+import sys
+import time
+
+testingBlocks=os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, testingBlocks)
+from eapiStandInServer import startStandInServers
+
+spec=importlib.util.spec_from_file_location('topoGen', os.path.join(testingBlocks, '..', 'topoGen-python3.py'))
+topoGen=importlib.util.module_from_spec(spec)
+spec.loader.exec_module(topoGen)
+
+messages=[]
+class MessageCollector(logging.Handler):
+	def emit(self, record):
+		messages.append(record.getMessage())
+logging.getLogger().addHandler(MessageCollector())
+logging.getLogger().setLevel(logging.INFO)
+
+addresses=startStandInServers({'lf218':3})
+topoGen.collectionOptions.update({'collector':'async', 'eapiTransport':'http', 'eapiTimeout':1, 'eapiConcurrency':0, 'fetchConnectedIntfs':True})
+
+wallStart=time.perf_counter()
+topoGen.prefetchDutResponses(list(addresses.values()))
+wallTime=time.perf_counter()-wallStart
+
+#All the DUTs are requested at once, so the run takes about one timeout and not the sum of all the requests
+assert wallTime<2, wallTime
+
+#The recorded DUTs are converted to the same format as SWAT
+responses=topoGen.dutResponses[addresses['ck338']]
+assert responses['connectedIntfs']==['et10/1', 'et10/2', 'et10/3', 'et10/4', 'et16/1', 'et16/2', 'et16/3', 'ma1', 'po1'], responses['connectedIntfs']
+assert {'neighbor':'lf218.sjc.aristanetworks.com', 'neighbor-port':'Et27', 'port':'Et10/1', 'ttl':120} in responses['lldp']['neighbors'], responses['lldp']
+assert responses['speeds']['Et48']==10000000000, responses['speeds']
+
+#The slow DUT is skipped with a message that names the timeout
+assert topoGen.dutResponses[addresses['lf218']]=={'lldp':{'neighbors':[]}, 'connectedIntfs':[], 'speeds':{}}
+skipped=[message for message in messages if addresses['lf218'] in message and 'Skipping' in message]
+assert len(skipped)==1 and 'timed out after 1 seconds' in skipped[0], skipped
+
+print("async eAPI check passed")
@@ -0,0 +1,70 @@
+#Local stand-in for the eAPI of DUTs, used to try the 'eapi' and 'async' collectors without real devices
+#Every DUT recorded in 'eapi-recorded/<dut>.json' (the JSON result of every command) gets its own HTTP server on 127.0.0.1. DUTs can be made slow to try the eAPI timeout
+#Run it using 'python3 TestingBlocks/eapiStandInServer.py --slow lf218=5' and give the printed 'host:port' of the DUTs to topoGen-python3.py with '--collector async --eapi-transport http'
+import argparse
+import glob
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+recordedDir=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'eapi-recorded')
+
+#The below class answers the eAPI JSON-RPC requests of one DUT from its recorded command results
+class StandInHandler(BaseHTTPRequestHandler):
+	def do_POST(self):
+		request=json.loads(self.rfile.read(int(self.headers['Content-Length'])).decode())
+		time.sleep(self.server.delay)
+
+		cmds=request['params']['cmds']
+		missing=[cmd for cmd in cmds if cmd not in self.server.recorded]
+		if missing:
+			response={'jsonrpc':'2.0', 'id':request['id'], 'error':{'code':1002, 'message':"CLI command '"+missing[0]+"' was not recorded for "+self.server.dut}}
+		else:
+			response={'jsonrpc':'2.0', 'id':request['id'], 'result':[self.server.recorded[cmd] for cmd in cmds]}
+
+		body=json.dumps(response).encode()
+		self.send_response(200)
+		self.send_header('Content-Type', 'application/json')
+		self.send_header('Content-Length', str(len(body)))
+		self.end_headers()
+		try:
+			self.wfile.write(body)
+		except (BrokenPipeError, ConnectionResetError):
+			#The client gave up on a slow DUT
+			pass
+
+	def log_message(self, *args):
+		pass
+
+#The below function starts one stand-in server for every recorded DUT, delaying the answers of the DUTs in 'slowDuts' (dut -> seconds).
+#Returns a dictionary of dut to the 'host:port' to give to the collectors
+def startStandInServers(slowDuts=None, directory=recordedDir):
+	addresses={}
+	for filePath in sorted(glob.glob(os.path.join(directory, '*.json'))):
+		dut=os.path.basename(filePath)[:-len('.json')]
+		server=ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+		server.daemon_threads=True
+		server.dut=dut
+		server.delay=(slowDuts or {}).get(dut, 0)
+		with open(filePath) as f:
+			server.recorded=json.load(f)
+		threading.Thread(target=server.serve_forever, daemon=True).start()
+		addresses[dut]='127.0.0.1:%d' % server.server_port
+	return addresses
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Serves the recorded eAPI results of DUTs on 127.0.0.1, one port per DUT')
+	parser.add_argument('--recorded', default=recordedDir, help='Directory of recorded eAPI results (default = TestingBlocks/eapi-recorded)')
+	parser.add_argument('--slow', nargs='+', default=[], metavar='DUT=SECONDS', help='Delay the answers of these DUTs by the given seconds')
+	options = parser.parse_args()
+
+	slowDuts=dict((dut, float(seconds)) for dut,_,seconds in (entry.partition('=') for entry in options.slow))
+	for dut,address in startStandInServers(slowDuts, options.recorded).items():
+		print(dut+' '+address)
+	try:
+		while True:
+			time.sleep(3600)
+	except KeyboardInterrupt:
+		pass
@@ -0,0 +1,38 @@
+#Check of the levels inferred by 'topoGen-python3.py --levels auto' on a leaf/spine/super-spine fabric where only some leaves have Ixia ports
+#Run it using 'python3 TestingBlocks/inferLevelsCheck.py' from where topoGen-python3.py itself runs (it needs the same SWAT libraries to be importable)
+import importlib.util
+import os
+
+spec=importlib.util.spec_from_file_location('topoGen', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'topoGen-python3.py'))
+topoGen=importlib.util.module_from_spec(spec)
+spec.loader.exec_module(topoGen)
+Link=topoGen.Link
+
+#Two pods: lf001-lf003 on sp001/sp002 and lf004-lf005 on sp003/sp004. Both super-spines connect to all four spines
+fabric=[]
+for leaf in ('lf001','lf002','lf003'):
+	for spine in ('sp001','sp002'):
+		fabric.append(Link(spine, 'Et1', leaf, 'Et49'))
+for leaf in ('lf004','lf005'):
+	for spine in ('sp003','sp004'):
+		fabric.append(Link(spine, 'Et1', leaf, 'Et49'))
+for superSpine in ('ss001','ss002'):
+	for spine in ('sp001','sp002','sp003','sp004'):
+		fabric.append(Link(superSpine, 'Et1', spine, 'Et50'))
+
+#Only lf001 and lf002 have Ixia ports
+ixia=[Link('Ixia', 'unknown', 'lf001', 'Et1'), Link('Ixia', 'unknown', 'lf002', 'Et1')]
+
+expected={'lf001':1, 'lf002':1, 'lf003':1, 'lf004':1, 'lf005':1, 'sp001':2, 'sp002':2, 'sp003':2, 'sp004':2, 'ss001':3, 'ss002':3}
+
+#Without Ixia ports (-i), the least connected DUTs are the leaves
+levels=topoGen.inferLevels(fabric)
+assert levels==expected, levels
+
+#With Ixia ports, Ixia is at the bottom and every leaf is one level above it, including the leaves without Ixia ports
+levels=topoGen.inferLevels(fabric+ixia)
+expectedWithIxia=dict((device,level+1) for device,level in expected.items())
+expectedWithIxia['Ixia']=1
+assert levels==expectedWithIxia, levels
+
+print("inferLevels check passed")
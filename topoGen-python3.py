@@ -12,19 +12,42 @@ This tool also gives you the option to include Ixia ports
 
 #Python Module Imports
 import argparse
+import asyncio
+import base64
 import collections
+import contextlib
+import cProfile
+import csv
+import hashlib
+import html
+import functools
+import json
 import logging
 import os
 import re
+import shutil
 import string
 import socket
+import ssl
 import subprocess
+import sys
+import threading
 import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from random import randint
 
 #Non-SWAT and non-default Python libraries that are additionally needed by this script
 import graphviz
 from graphviz import Source 
+try:
+	import pyeapi #eApi support, only needed for '--collector eapi'
+except ImportError:
+	pyeapi=None
+try:
+	import yaml #Only needed for YAML level files given using '--levels'
+except ImportError:
+	yaml=None
 
 #SWAT Module Imports
 import logLib
@@ -79,9 +102,9 @@ def fileDutList(username,filePath):
 		logging.info("\n[ERROR]: File does not exist in "+filePath+" . Please ensure correct file location to proceed \n")
 		abort()
 
-#The below function uses SWAT library to find the list of DUTs owned by user
+#The below function uses SWAT library to get the Art inventory of a pool as a dictionary of dut to dut information (owner and prefix)
 @checkProxySession
-def userDutList(username,poolname):
+def fetchArtInventory(poolname):
 
 	#alldevices=findDuts(pool=poolname, all=True)
 	cmd = "Art list --pool=%s" % poolname
@@ -90,10 +113,7 @@ def userDutList(username,poolname):
 
 
 	# Parse Output
-	retVal = {}
-	prefixes=None
-	chipsets=None
-	category='all'
+	retVal = collections.OrderedDict()
 	for line in output[2:]:
         # Initialize DUT Variables
 		dut = line[0]
@@ -110,22 +130,56 @@ def userDutList(username,poolname):
 		owner = line[2] if line[2] != '+' else line[4]
 
         # Create dictionary with duts as keys & dut information as values
-		retVal[dut] = { 'owner': owner}
-
-		retVal = collections.OrderedDict(retVal)
-
-	devices=retVal.items()
-
-	dictOfDevicesbyuser=[]
-	listofDevicesbyuser=[]
-
-	for i,data in enumerate(devices):
-		if data[1]['owner']==username:
-			dictOfDevicesbyuser.append(data)
-			listofDevicesbyuser.append(data[0])
+		retVal[dut] = { 'owner': owner, 'prefix': dutPrefix}
+
+	return retVal
+
+#Art inventory snapshots of every pool used in this run, keyed by pool name
+inventorySnapshots={}
+
+#The below function builds a snapshot of the Art inventory of a pool, indexed by owner and by DUT prefix
+def inventorySnapshot(devices, timestamp):
+	snapshot={'timestamp':timestamp, 'devices':devices, 'byOwner':{}, 'byPrefix':{}}
+	for dut,info in devices.items():
+		snapshot['byOwner'].setdefault(info['owner'],[]).append(dut)
+		snapshot['byPrefix'].setdefault(info['prefix'],[]).append(dut)
+	return snapshot
+
+#The below function returns the snapshot of the Art inventory of a pool. The snapshot is kept in the cache directory and the proxy is not contacted while the snapshot is younger than the inventory TTL
+def artInventorySnapshot(poolname):
+	with timedStage('inventory'):
+		ttl=collectionOptions['inventoryTtl']
+		snapshot=inventorySnapshots.get(poolname)
+		if snapshot is not None and time.time()-snapshot['timestamp']<ttl:
+			return snapshot
+
+		cacheFile=cacheFilePath('inventory', poolname+'.json')
+		if ttl>0:
+			try:
+				with open(cacheFile) as f:
+					entry=json.load(f)
+				if time.time()-entry['timestamp']<ttl:
+					logging.info("  * Using cached Art inventory of pool "+poolname)
+					inventorySnapshots[poolname]=inventorySnapshot(collections.OrderedDict(entry['devices']), entry['timestamp'])
+					return inventorySnapshots[poolname]
+			except (IOError, ValueError, KeyError):
+				pass
+
+		devices=fetchArtInventory(poolname)
+		inventorySnapshots[poolname]=inventorySnapshot(devices, time.time())
+		if ttl>0:
+			with open(cacheFile,'w') as f:
+				json.dump({'timestamp':inventorySnapshots[poolname]['timestamp'], 'devices':list(devices.items())}, f)
+		return inventorySnapshots[poolname]
+
+#The below function returns the Art inventory of a pool as a dictionary of dut to dut information (owner and prefix)
+def artInventory(poolname):
+	return artInventorySnapshot(poolname)['devices']
+
+#The below function finds the list of DUTs owned by user using the Art inventory of the pool
+def userDutList(username,poolname):
 
-	#print dictOfDevicesbyuser
-	#print listofDevicesbyuser
+	listofDevicesbyuser=list(artInventorySnapshot(poolname)['byOwner'].get(username,[]))
 
 	#print "\n > The DUTs owned by " + username +" are:  \n\t *  " + str(listofDevicesbyuser)
 	print ("\n > The DUTs owned by are:  \n\t *  " ) 
@@ -133,6 +187,18 @@ def userDutList(username,poolname):
 
 	return listofDevicesbyuser
 
+#The below function finds the DUTs of every user in every pool using one Art inventory snapshot per pool. With allOwners, every owner in the pools is used. Returns a dictionary of owner to list of DUTs
+def ownerDutLists(usernames, poolnames, allOwners=False):
+	dutsByOwner=collections.OrderedDict()
+	for poolname in poolnames:
+		byOwner=artInventorySnapshot(poolname)['byOwner']
+		for owner in (byOwner if allOwners else usernames):
+			dutsByOwner.setdefault(owner,[]).extend(byOwner.get(owner,[]))
+
+	for owner,duts in dutsByOwner.items():
+		logging.info("\n > The DUTs owned by "+owner+" are:  \n\t *  "+str(duts))
+	return dutsByOwner
+
 '''	
 #The below function uses SWAT library to find the list of DUTs owned by user...has oauth2client version issue...The above commented code fixes this
 def userDutList(username,poolname):
@@ -177,100 +243,601 @@ def warningMessage():
 	logging.info(message)
 	print ("----------------------------------------------------------------------------------")
 	
-def lldpInfo(dutslist):
-	
-#The below code will grab lldp info from all DUTs in json format using SWAT library 
-	tempDictOfConnections=[]
+#Options for how device data is collected. mainFunc fills these in from the command line flags
+collectionOptions={'collector':'swat', 'workers':1, 'eapiTransport':'https', 'eapiUser':'admin', 'eapiPassword':'', 'eapiTimeout':30, 'eapiConcurrency':0, 'recordDir':None, 'replayDir':None,
+	'cacheDir':os.path.expanduser('~/.topoGen/cache'), 'cacheTtl':0, 'refreshDuts':[], 'inventoryTtl':900, 'fetchConnectedIntfs':False}
+
+#Registry of SWAT device sessions. Every DUT is connected to only once per run and the same session is handed to the lldp, Ixia and any later pass
+deviceSessions={}
+#Raw responses of every DUT keyed by dut and then by 'lldp', 'connectedIntfs' and 'speeds'
+dutResponses={}
+#DUTs whose responses were loaded from the cache, and the time at which the cache entry of every DUT was first written
+cachedDuts=set()
+cacheTimestamps={}
+dutLocks={}
+dutLocksGuard=threading.Lock()
+
+#Wall time, CPU time and peak memory of every stage of the run and the collection time of every DUT. These are recorded only with --timings or --profile (memory only with --timings)
+timingOptions={'enabled':False, 'traceMemory':False}
+stageTimings=collections.OrderedDict()
+dutTimings=collections.OrderedDict()
+timingsLock=threading.Lock()
+
+#The below function starts recording the timings. Memory is traced only if 'traceMemory' is set since tracing slows down the script (and would distort a cProfile run)
+def startTimings(traceMemory=True):
+	timingOptions['enabled']=True
+	timingOptions['traceMemory']=traceMemory
+	timingOptions['start']=time.perf_counter()
+	if traceMemory:
+		tracemalloc.start()
+
+#The below function records the wall time, CPU time and peak memory of the code run inside it under the name of the stage. Stages that run more than once are added up.
+#The peak memory is what the stage allocated on top of the memory in use when it started (the largest of all its runs)
+@contextlib.contextmanager
+def timedStage(stage):
+	if not timingOptions['enabled']:
+		yield
+		return
 
-	for i in range(0,len(dutslist)):
-		
-		#Getting LLDP info using SWAT library function
-		a=connectDevices(dutslist[i])
-		logging.info("  * Getting LLDP info from "+dutslist[i])
-		a,=a
-		temp = a.getLldpInfo()
+	if timingOptions['traceMemory']:
+		tracemalloc.reset_peak()
+		memoryStart=tracemalloc.get_traced_memory()[0]
+	wallStart=time.perf_counter()
+	cpuStart=time.process_time()
+	try:
+		yield
+	finally:
+		with timingsLock:
+			entry=stageTimings.setdefault(stage, {'calls':0, 'wallTime':0.0, 'cpuTime':0.0})
+			entry['calls']+=1
+			entry['wallTime']+=time.perf_counter()-wallStart
+			entry['cpuTime']+=time.process_time()-cpuStart
+			if timingOptions['traceMemory']:
+				entry['peakMemory']=max(entry.get('peakMemory',0), tracemalloc.get_traced_memory()[1]-memoryStart)
+
+#The below function records how long the collection from one DUT took. With the async collector, only the wall time of the eAPI request is known
+def recordDutTiming(dut, wallTime, cpuTime=None):
+	if timingOptions['enabled']:
+		with timingsLock:
+			entry=dutTimings.setdefault(dut, {'wallTime':0.0, 'cpuTime':0.0})
+			entry['wallTime']+=wallTime
+			entry['cpuTime']+=cpuTime or 0.0
+
+#The below function writes the recorded timings as JSON to 'filePath' and logs the stages and the slowest DUTs
+def writeTimingReport(filePath):
+	report={'totalWallTime':time.perf_counter()-timingOptions['start'], 'stages':stageTimings, 'duts':dutTimings}
+	if timingOptions['traceMemory']:
+		report['peakMemory']=tracemalloc.get_traced_memory()[1]
+	with open(filePath,'w') as f:
+		json.dump(report, f, indent=2)
+
+	if timingOptions['traceMemory']:
+		logging.info("\n > Timings (wall/cpu seconds, peak memory of the stage):")
+		for stage,entry in stageTimings.items():
+			logging.info("\t * %-14s %8.2f %8.2f %10d bytes" % (stage, entry['wallTime'], entry['cpuTime'], entry['peakMemory']))
+	else:
+		logging.info("\n > Timings (wall/cpu seconds):")
+		for stage,entry in stageTimings.items():
+			logging.info("\t * %-14s %8.2f %8.2f" % (stage, entry['wallTime'], entry['cpuTime']))
+	slowest=sorted(dutTimings.items(), key=lambda item: item[1]['wallTime'], reverse=True)[:5]
+	if slowest:
+		logging.info("\t * Slowest DUTs: "+', '.join(dut+' (%.2fs)' % entry['wallTime'] for dut,entry in slowest))
+	logging.info(" > Timing report written to "+filePath)
+
+#The below function returns a lock that is specific to one DUT so that parallel workers never connect to the same DUT twice
+def dutLock(dut):
+	with dutLocksGuard:
+		if dut not in dutLocks:
+			dutLocks[dut]=threading.RLock()
+		return dutLocks[dut]
+
+#The below function returns the SWAT session of a DUT, connecting to it only if there is no session yet
+def getDeviceSession(dut):
+	with dutLock(dut):
+		if dut not in deviceSessions:
+			a=connectDevices(dut)
+			a,=a
+			deviceSessions[dut]=a
+		return deviceSessions[dut]
+
+#The below function converts eAPI interface names to the short names used by SWAT. Eg) Ethernet10/1 to Et10/1 (or et10/1 if lowercase is needed)
+def eapiIntfName(name, lowercase=False):
+	for longName,shortName in (('Ethernet','Et'),('Management','Ma'),('Port-Channel','Po')):
+		if name.startswith(longName):
+			name=shortName+name[len(longName):]
+			break
+	if lowercase:
+		return name[:2].lower()+name[2:]
+	return name
+
+#The below function converts the results of the eAPI command bundle into the same format as SWAT's getLldpInfo() and getConnectedIntfs()
+def eapiBundleFromResult(result):
+	lldpResult, intfResult = result
+
+	neighbors=[]
+	for neighbor in lldpResult['lldpNeighbors']:
+		neighbors.append({'neighbor':neighbor['neighborDevice'], 'neighbor-port':eapiIntfName(neighbor['neighborPort']), 'port':eapiIntfName(neighbor['port']), 'ttl':neighbor.get('ttl')})
+
+	connectedIntfs=[]
+	speeds={}
+	for intf,status in sorted(intfResult['interfaceStatuses'].items()):
+		if status.get('linkStatus')=='connected':
+			connectedIntfs.append(eapiIntfName(intf, lowercase=True))
+		speeds[eapiIntfName(intf)]=status.get('bandwidth')
+
+	return {'lldp':{'neighbors':neighbors}, 'connectedIntfs':connectedIntfs, 'speeds':speeds}
+
+#Commands sent to every DUT in a single eAPI request by the eapi and async collectors
+eapiBundleCommands=['show lldp neighbors', 'show interfaces status']
+
+#The below function gets lldp neighbors, connected interfaces and interface speeds of a DUT in one eAPI request
+def getEapiBundle(dut):
+	if pyeapi is None:
+		abort("[ERROR]: pyeapi is not installed. Please do 'pip install -r requirements.txt' to use the eapi collector")
+
+	conn = pyeapi.connect(host=dut, transport=collectionOptions['eapiTransport'], username=collectionOptions['eapiUser'], password=collectionOptions['eapiPassword'])
+	temp = conn.execute(eapiBundleCommands)
+	return eapiBundleFromResult(temp['result'])
+
+#The below function sends one eAPI JSON-RPC request to a DUT using asyncio and returns its 'result' list. A DUT can be given as 'host:port'
+async def asyncEapiRequest(dut, commands):
+	host,_,port=dut.partition(':')
+	transport=collectionOptions['eapiTransport']
+	if not port:
+		port=443 if transport=='https' else 80
+
+	sslContext=None
+	if transport=='https':
+		#Lab devices use self signed certificates
+		sslContext=ssl.create_default_context()
+		sslContext.check_hostname=False
+		sslContext.verify_mode=ssl.CERT_NONE
+
+	body=json.dumps({'jsonrpc':'2.0', 'method':'runCmds', 'params':{'version':1, 'cmds':commands, 'format':'json'}, 'id':dut}).encode()
+	auth=base64.b64encode((collectionOptions['eapiUser']+':'+collectionOptions['eapiPassword']).encode()).decode()
+	request=('POST /command-api HTTP/1.0\r\nHost: %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\nAuthorization: Basic %s\r\n\r\n' % (host,len(body),auth)).encode()+body
+
+	async def exchange():
+		reader,writer=await asyncio.open_connection(host,int(port),ssl=sslContext)
+		try:
+			writer.write(request)
+			await writer.drain()
+			return await reader.read()
+		finally:
+			writer.close()
+
+	try:
+		response=await asyncio.wait_for(exchange(), collectionOptions['eapiTimeout'])
+	except asyncio.TimeoutError:
+		#TimeoutError has no message, so the timeout is named here for the 'Skipping' message
+		raise IOError("eAPI request to "+dut+" timed out after "+str(collectionOptions['eapiTimeout'])+" seconds")
+	header,_,payload=response.partition(b'\r\n\r\n')
+	statusLine=header.split(b'\r\n')[0].decode()
+	if ' 200' not in statusLine:
+		raise IOError("eAPI request to "+dut+" failed with '"+statusLine+"'")
+
+	temp=json.loads(payload.decode())
+	if 'error' in temp:
+		raise IOError("eAPI request to "+dut+" failed with '"+str(temp['error'].get('message'))+"'")
+	return temp['result']
+
+#The below function runs the eAPI command bundle on all the DUTs from a single thread using asyncio. At most 'eapiConcurrency' requests are in flight at a time (0 means all the DUTs at once).
+#Returns a dictionary of dut to bundle, or to the exception raised for that DUT
+def getAsyncEapiBundles(dutslist):
+	async def collectAll():
+		semaphore=asyncio.Semaphore(collectionOptions['eapiConcurrency'] if collectionOptions['eapiConcurrency']>0 else max(len(dutslist),1))
+
+		async def collectOne(dut):
+			async with semaphore:
+				wallStart=time.perf_counter()
+				try:
+					return eapiBundleFromResult(await asyncEapiRequest(dut, eapiBundleCommands))
+				except Exception as e:
+					return e
+				finally:
+					recordDutTiming(dut, time.perf_counter()-wallStart)
+
+		return await asyncio.gather(*[collectOne(dut) for dut in dutslist])
+
+	return dict(zip(dutslist, asyncio.run(collectAll())))
+
+#The below function writes all raw responses of a DUT to '<recordDir>/<dut>.json' so that they can be replayed later using --replay
+def recordDutResponses(dut):
+	if not collectionOptions['recordDir']:
+		return
+	with dutLock(dut):
+		with open(os.path.join(collectionOptions['recordDir'], dut+'.json'),'w') as f:
+			json.dump(dutResponses[dut], f, indent=2, sort_keys=True)
 
-		allneighbors =temp['neighbors']
+#The below function reads the recorded responses of a DUT from '<replayDir>/<dut>.json'. DUTs that were not recorded are skipped with a message
+def replayDutResponses(dut):
+	try:
+		with open(os.path.join(collectionOptions['replayDir'], dut+'.json')) as f:
+			responses=json.load(f)
+	except IOError:
+		logging.info("[MESSAGE]: Skipping "+dut+" since there is no recorded data for it in "+collectionOptions['replayDir'])
+		return {'lldp':{'neighbors':[]}, 'connectedIntfs':[], 'speeds':{}}
+
+	if 'lldp' not in responses:
+		logging.info("[MESSAGE]: No lldp neighbors are used for "+dut+" since there is no recorded lldp data for it in "+collectionOptions['replayDir'])
+		responses['lldp']={'neighbors':[]}
+	return responses
+
+#The below function returns the list of DUTs that have recorded data in the replay directory
+def recordedDutList(replayDir):
+	recorded=sorted(name[:-len('.json')] for name in os.listdir(replayDir) if name.endswith('.json'))
+	logging.info("\n > List of DUTS as per the recorded data in "+replayDir+" is:")
+	logging.info("\t * "+str(recorded))
+	return recorded
+
+#The below function tells whether all the responses needed from a DUT are already there (eg. from the cache). The connected interfaces are needed only when Ixia ports are included
+def hasDutResponses(dut):
+	needed=('lldp','connectedIntfs') if collectionOptions['fetchConnectedIntfs'] else ('lldp',)
+	responses=dutResponses.get(dut,{})
+	return all(key in responses for key in needed)
+
+#The below function fills in the responses of all the DUTs in one go when the async collector is used. DUTs that fail are skipped with a message
+def prefetchDutResponses(dutslist):
+	if collectionOptions['collector']!='async' or collectionOptions['replayDir']:
+		return
+
+	for dut,bundle in getAsyncEapiBundles([dut for dut in dutslist if not hasDutResponses(dut)]).items():
+		failed=isinstance(bundle, Exception)
+		if failed:
+			logging.info("[MESSAGE]: Skipping "+dut+" since eAPI request failed with error: "+str(bundle))
+			bundle={'lldp':{'neighbors':[]}, 'connectedIntfs':[], 'speeds':{}}
+		with dutLock(dut):
+			dutResponses.setdefault(dut,{}).update(bundle)
+		recordDutResponses(dut)
+		if not failed:
+			writeDutCache(dut)
+
+#The below function returns the raw 'lldp' or 'connectedIntfs' response of a DUT. Every response is fetched only once per run and then shared by all the passes
+def getDutResponse(dut, key):
+	with dutLock(dut):
+		responses=dutResponses.setdefault(dut,{})
+		if key not in responses:
+			if collectionOptions['replayDir']:
+				responses.update(replayDutResponses(dut))
+				return responses.get(key, [])
+			if collectionOptions['collector']=='eapi':
+				responses.update(getEapiBundle(dut))
+			elif collectionOptions['collector']=='async':
+				bundle=getAsyncEapiBundles([dut])[dut]
+				if isinstance(bundle, Exception):
+					raise bundle
+				responses.update(bundle)
+			elif key=='lldp':
+				responses['lldp']=getDeviceSession(dut).getLldpInfo()
+			elif key=='connectedIntfs':
+				responses['connectedIntfs']=getDeviceSession(dut).getConnectedIntfs()
+			recordDutResponses(dut)
+			writeDutCache(dut)
+		return responses[key]
+
+#The below function grabs the lldp neighbors of a single DUT using SWAT library (or eAPI)
+def getLldpNeighbors(dut):
+
+	if dut not in cachedDuts:
+		logging.info("  * Getting LLDP info from "+dut)
+	temp = getDutResponse(dut, 'lldp')
+
+	allneighbors =temp['neighbors']
+
+	neighbors=[]
+	for j in range(0,len(allneighbors)):
+		temp_diction = dict(allneighbors[j])
+		temp_diction['myDevice']=str(dut) #+'.sjc.aristanetworks.com'
+		neighbors.append(temp_diction)
+
+	return neighbors[:-1]
+
+#The below function returns the path of a file in the cache directory, creating the sub directory if needed (parallel workers may create it at the same time)
+def cacheFilePath(subdir, name):
+	directory=os.path.join(collectionOptions['cacheDir'], subdir)
+	os.makedirs(directory, exist_ok=True)
+	return os.path.join(directory, name)
+
+#The below function loads the cached responses (lldp neighbors, connected interfaces and speeds) of a DUT into dutResponses so that they are not fetched from the DUT again.
+#Returns False if the DUT has no entry, the entry is older than the TTL or the user asked to refresh it
+def loadDutCache(dut):
+	#The cache is not used while recording since the recorded file must have the responses of the DUT
+	if collectionOptions['cacheTtl']<=0 or collectionOptions['replayDir'] or collectionOptions['recordDir'] or dut in collectionOptions['refreshDuts']:
+		return False
+	if dut in cachedDuts:
+		return True
+	try:
+		with open(cacheFilePath('duts', dut+'.json')) as f:
+			entry=json.load(f)
+		if time.time()-entry['timestamp']>=collectionOptions['cacheTtl']:
+			return False
+		with dutLock(dut):
+			dutResponses.setdefault(dut,{}).update(entry['responses'])
+			cacheTimestamps[dut]=entry['timestamp']
+			cachedDuts.add(dut)
+		return True
+	except (IOError, ValueError, KeyError):
+		return False
+
+#The below function writes the responses of a DUT to its cache entry. Responses fetched later for a cached DUT (eg. connected interfaces) are added to the same entry and expire with it
+def writeDutCache(dut):
+	if collectionOptions['cacheTtl']<=0 or collectionOptions['replayDir']:
+		return
+	with dutLock(dut):
+		with open(cacheFilePath('duts', dut+'.json'),'w') as f:
+			json.dump({'timestamp':cacheTimestamps.setdefault(dut,time.time()), 'responses':dutResponses[dut]}, f)
+
+#The below function grabs the lldp neighbors of a DUT from the cache if it is still valid. Else, it gets them from the DUT (which also updates the cache).
+#When Ixia ports are included, the connected interfaces are fetched here as well, so that they are fetched in parallel with the lldp info and the Ixia pass does not connect to the DUTs again
+def getCachedLldpNeighbors(dut):
+	if loadDutCache(dut) and hasDutResponses(dut):
+		logging.info("  * Using cached LLDP info for "+dut)
+		return getLldpNeighbors(dut)
+
+	wallStart=time.perf_counter()
+	cpuStart=time.thread_time()
+	neighbors=getLldpNeighbors(dut)
+	if collectionOptions['fetchConnectedIntfs']:
+		try:
+			logging.info("  * Getting Ixia Details info from "+dut)
+			getDutResponse(dut, 'connectedIntfs')
+		except Exception as e:
+			logging.info("[MESSAGE]: Skipping "+dut +" from Ixia connection calculation due to error: "+ str(e))
+	recordDutTiming(dut, time.perf_counter()-wallStart, time.thread_time()-cpuStart)
+	return neighbors
 
-		for j in range(0,len(allneighbors)):
-			temp_diction = allneighbors[j]
-			temp_diction['myDevice']=str(dutslist[i]) #+'.sjc.aristanetworks.com'
-			tempDictOfConnections.append(temp_diction)
+#Regular expresion to get only the DUT name (and not hostname) since some people use naming schemes like ck221_leaf (OR) s1_ckp355
+dutNameRegex = r"(?:[^\-_\+\|\.]*)[a-z][a-z][0-9][0-9][0-9](?:[^\-_\+\|\.]*)"
 
-		tempDictOfConnections = tempDictOfConnections[:-1]
+#Compiled hostname patterns (the first matching pattern gives the DUT name) and the memo of lldp system name to DUT name, since the same names repeat for every link
+hostnamePatterns=[re.compile(dutNameRegex, re.I | re.U)]
+dutNames={}
 
-	#************************************************************************
-	#The below code will use regular expresions to get only the DUT name (and not hostname) since some people use naming schemes like ck221_leaf (OR) s1_ckp355
+#The below function replaces the hostname patterns with the ones given by the user, eg. for sites with other naming schemes. If a pattern has a group, the first group is the DUT name, else the whole match
+def setHostnamePatterns(patterns):
+	compiled=[]
+	for pattern in patterns:
+		try:
+			compiled.append(re.compile(pattern, re.I | re.U))
+		except re.error as e:
+			abort("[ERROR]: Hostname pattern '"+pattern+"' is not a valid regex: "+str(e))
+	hostnamePatterns[:]=compiled
+	dutNames.clear()
+
+#The below function returns the DUT name of an lldp neighbor, or None if the neighbor is not a DUT (eg. linux servers)
+def dutNameFromLldp(name):
+	if name not in dutNames:
+		dutNames[name]=None
+		for pattern in hostnamePatterns:
+			matches = pattern.search(name)
+			if matches:
+				dutNames[name]=sys.intern((matches.group(1) if pattern.groups else matches.group()).split('.')[0])
+				break
+	return dutNames[name]
+
+#The below function returns the name of a device as used in the topology: the DUT name, or the hostname without domain for other devices
+def canonicalDeviceName(name):
+	return dutNameFromLldp(name) or sys.intern(name.split('.')[0])
+
+#The below function runs 'func' for every DUT using a pool of 'workers' threads. Results are returned in the same order as dutslist irrespective of which DUT answers first
+def collectFromDuts(func, dutslist, workers=1):
+	if workers<=1 or len(dutslist)<=1:
+		return [func(dut) for dut in dutslist]
+
+	with ThreadPoolExecutor(max_workers=min(workers,len(dutslist))) as executor:
+		return list(executor.map(func, dutslist))
+
+#Keys of an lldp neighbor dictionary that make up the two ends of a connection. Every other key (eg. ttl) is kept in Link.extras
+linkDictKeys=('neighbor','neighbor-port','myDevice','port')
+
+#The below class is one connection between two devices, used from the lldp info till the graph generation. __slots__ and interned device/port names keep large inventories small in memory.
+#Links are immutable, so their hash is computed once and they can be compared, put in sets or used as dictionary keys (eg. to diff two topologies). Normalizing a link builds a new Link.
+#'extras' has the other lldp fields of the connection as sorted (key,value) pairs
+class Link(object):
+	__slots__=('neighbor','neighborPort','myDevice','port','extras','_hash')
+
+	def __init__(self, neighbor, neighborPort, myDevice, port, extras=()):
+		object.__setattr__(self, 'neighbor', sys.intern(neighbor))
+		object.__setattr__(self, 'neighborPort', sys.intern(neighborPort))
+		object.__setattr__(self, 'myDevice', sys.intern(myDevice))
+		object.__setattr__(self, 'port', sys.intern(port))
+		object.__setattr__(self, 'extras', tuple(extras))
+		object.__setattr__(self, '_hash', hash(self.key()))
+
+	#The below function makes a Link from an lldp neighbor dictionary as given by SWAT or eAPI, with 'myDevice' added. 'deviceName' (if given) normalizes the names of both devices
+	@classmethod
+	def fromDict(cls, record, deviceName=None):
+		extras=tuple(sorted((key,str(value)) for key,value in record.items() if key not in linkDictKeys))
+		neighbor,myDevice=record['neighbor'],record['myDevice']
+		if deviceName:
+			neighbor,myDevice=deviceName(neighbor),deviceName(myDevice)
+		return cls(neighbor, record['neighbor-port'], myDevice, record['port'], extras)
+
+	def __setattr__(self, name, value):
+		raise AttributeError("Link is immutable. Build a new Link instead of changing '"+name+"'")
+
+	def __delattr__(self, name):
+		raise AttributeError("Link is immutable. Build a new Link instead of deleting '"+name+"'")
+
+	#Needed since the default pickling (eg. for worker processes) sets the slots one by one
+	def __reduce__(self):
+		return (Link, self.key())
+
+	def endpoints(self):
+		return ((self.neighbor,self.neighborPort),(self.myDevice,self.port))
+
+	def key(self):
+		return (self.neighbor,self.neighborPort,self.myDevice,self.port,self.extras)
+
+	def __eq__(self, other):
+		return isinstance(other,Link) and self.key()==other.key()
+
+	def __hash__(self):
+		return self._hash
+
+	def __repr__(self):
+		return 'Link('+', '.join(repr(value) for value in self.key())+')'
+
+#The below function removes duplicate connections (the same link reported by both of its ends) in a single pass.
+#A link is identified by the sorted pair of its (device, port) ends plus the remaining lldp fields, so the identity is the same from either end.
+#Same as the earlier swap-and-compare loop, the first record of a pair is dropped. The records that are kept are returned as they are (connectionsFromLldpRecords swaps their ends)
+def deduplicateConnections(tempDictOfConnections):
+	unmatched={}   #link identity -> records that have not met their other end yet
+	dropped=set()
+
+	for i,link in enumerate(tempDictOfConnections):
+		near,far=link.endpoints()
+		linkKey=(min(near,far),max(near,far),link.extras)
+		direction=near<far
+
+		waiting=unmatched.setdefault(linkKey,[])
+		for k,(j,otherDirection) in enumerate(waiting):
+			if otherDirection!=direction or near==far:
+				dropped.add(j)
+				del waiting[k]
+				break
+		else:
+			waiting.append((i,direction))
 
-	regex = r"(?:[^\-_\+\|\.]*)[a-z][a-z][0-9][0-9][0-9](?:[^\-_\+\|\.]*)"
+	return [link for i,link in enumerate(tempDictOfConnections) if i not in dropped]
 
-	for i in range(0,len(tempDictOfConnections)):
-		#For neighbor names
-		test_str = tempDictOfConnections[i]['neighbor']
-		matches = re.search(regex, test_str, re.I | re.U)  
-		if matches:     #To prevent AttributeError when there are no matches
-			tempDictOfConnections[i]['neighbor']= matches.group()
+def lldpInfo(dutslist, workers=1):
+	
+#The below code will grab lldp info from all DUTs in json format using SWAT library. With workers>1, the DUTs are polled in parallel
+	tempDictOfConnections=[]
 
-		#For my device names
-		test_str = tempDictOfConnections[i]['myDevice']
-		matches = re.search(regex, test_str, re.I | re.U)
-		if matches:
-			tempDictOfConnections[i]['myDevice']= matches.group()
+	with timedStage('collection'):
+		prefetchDutResponses([dut for dut in dutslist if not loadDutCache(dut) or not hasDutResponses(dut)])
+		for neighbors in collectFromDuts(getCachedLldpNeighbors, dutslist, workers):
+			tempDictOfConnections.extend(neighbors)
 
-	#************************************************************************
-	#The below code will remove the duplicates from the grand dictionary such that one connection shows up only once. The duplicates are marked as key=temp and value=NULL
+	return connectionsFromLldpRecords(tempDictOfConnections)
 
-	for i in range(0,len(tempDictOfConnections)):
-		tempvar= tempDictOfConnections[i] #Storing each dictionary in one temp variable
-		instantaneoustempvar= []
-		instantaneoustempvar=[tempvar['neighbor'],tempvar['neighbor-port']]
-		tempvar['neighbor']= tempvar['myDevice']
-		tempvar['neighbor-port']= tempvar['port']
-		tempvar['myDevice']=instantaneoustempvar[0]
-		tempvar['port']=instantaneoustempvar[1]
+#The below function converts the lldp neighbors of all the DUTs into the list of connections, with only DUT names and without duplicates
+def connectionsFromLldpRecords(tempDictOfConnections):
+	with timedStage('dedup'):
+		#************************************************************************
+		#The below code will get only the DUT name (and not hostname) since some people use naming schemes like ck221_leaf (OR) s1_ckp355, and remove the '.sjc.aristanetworks.com' in the name
 
-		count=0
-		for j in range(0,len(tempDictOfConnections)):
-			if tempvar == tempDictOfConnections[j]:
-				count=count+1
+		tempDictOfConnections=[Link.fromDict(record, canonicalDeviceName) for record in tempDictOfConnections]
 
-		if count==2:
-			tempDictOfConnections[i]={'temp':'Null'}
+		#************************************************************************
+		#The below code will remove the duplicates from the grand dictionary such that one connection shows up only once
 
+		tempDictOfConnections=deduplicateConnections(tempDictOfConnections)
 
-	#************************************************************************
-	#The below code will remove the duplicates completely by removing dictionaries with key as temp. ALso, removing the '.sjc.aristanetworks.com' in DUT name
+		#************************************************************************
+		#The below code will change the port names to 'Et' format, and build the final link with its ends swapped (same order as the earlier swap-and-compare loop)
 
-	dictionaryOfConnections=[] #This list will have only non-duplicate values
+		dictionaryOfConnections=[] #This list will have only non-duplicate values
 
-	for i in range(0,len(tempDictOfConnections)):
-		if tempDictOfConnections[i].get('temp')== None:
-			tempDictOfConnections[i]['neighbor']=tempDictOfConnections[i]['neighbor'].split('.')[0]
-			tempDictOfConnections[i]['myDevice']=tempDictOfConnections[i]['myDevice'].split('.')[0]
+		for link in tempDictOfConnections:
 			try:
-				tempDictOfConnections[i]['port']='Et'+(tempDictOfConnections[i]['port'].split('Et')[1])
-				tempDictOfConnections[i]['neighbor-port']='Et'+(tempDictOfConnections[i]['neighbor-port'].split('Et')[1])
+				port='Et'+(link.port.split('Et')[1])
+				neighborPort='Et'+(link.neighborPort.split('Et')[1])
 			except:
 				#This block will not make any changes to non-Arista devices
 				continue
 
-			dictionaryOfConnections.append(tempDictOfConnections[i])
+			dictionaryOfConnections.append(Link(link.myDevice, port, link.neighbor, neighborPort, link.extras))
+
+		return dictionaryOfConnections
 
-	return dictionaryOfConnections
 
+#The below function polls DUTs hop by hop starting from the 'seeds'. The DUTs seen as lldp neighbors in one hop and not polled yet are polled in the next hop (in parallel), until there are no new DUTs or 'maxHops' hops have been polled.
+#Only DUTs in 'allowedDuts' (if given) and not in 'excludedDuts' are polled. Every DUT is polled at most once. Returns the list of polled DUTs with their hop, and all their lldp neighbors
+def lldpCrawl(seeds, maxHops=None, allowedDuts=None, excludedDuts=(), workers=1):
+	polledDuts=collections.OrderedDict()
+	tempDictOfConnections=[]
+	frontier=list(collections.OrderedDict.fromkeys(seeds))
+	seen=set(frontier)
+
+	hop=0
+	while frontier:
+		logging.info("\n > Polling hop "+str(hop)+": "+str(frontier))
+		with timedStage('collection'):
+			prefetchDutResponses([dut for dut in frontier if not loadDutCache(dut) or not hasDutResponses(dut)])
+			hopNeighbors=collectFromDuts(getCachedLldpNeighbors, frontier, workers)
+		nextFrontier=[]
+		for dut,neighbors in zip(frontier, hopNeighbors):
+			polledDuts[dut]=hop
+			tempDictOfConnections.extend(neighbors)
+			for neighbor in neighbors:
+				neighborDut=dutNameFromLldp(neighbor['neighbor'])
+				if neighborDut is None or neighborDut in seen or neighborDut in excludedDuts:
+					continue
+				if allowedDuts is not None and neighborDut not in allowedDuts:
+					continue
+				seen.add(neighborDut)
+				nextFrontier.append(neighborDut)
+
+		if maxHops is not None and hop>=maxHops:
+			break
+		frontier=nextFrontier
+		hop=hop+1
+
+	return polledDuts, tempDictOfConnections
+
+#The below function keeps only the connections within 'hops' hops of the focus device, using an adjacency index built from the connections. Hosts/Ixia are not used as a path between DUTs.
+#Returns the connections and the distance of every device that was kept
+def extractNeighborhood(dictionaryOfConnections, focusDut, hops):
+	adjacency={}
+	for connection in dictionaryOfConnections:
+		ends=connection.endpoints()
+		for (device,port),(otherDevice,_) in (ends,ends[::-1]):
+			if not isHostEndpoint(device, port):
+				adjacency.setdefault(device,set()).add(otherDevice)
+
+	distance={focusDut:0}
+	queue=collections.deque([focusDut])
+	while queue:
+		device=queue.popleft()
+		if distance[device]>=hops:
+			continue
+		for neighbor in adjacency.get(device,()):
+			if neighbor not in distance:
+				distance[neighbor]=distance[device]+1
+				queue.append(neighbor)
 
-#The below function get ixia details (by finding diff of connected and lldp interfaces)
+	neighborhood=[connection for connection in dictionaryOfConnections if connection.neighbor in distance and connection.myDevice in distance]
+	return neighborhood, distance
+
+#The below function grabs lldp info only from the DUTs within 'hops' hops of the focus DUT, growing the set of polled DUTs hop by hop, and returns the connections in that neighborhood.
+#Also returns the DUTs whose Ixia ports are part of the neighborhood
+def focusedLldpInfo(focusDut, hops, dutslist=None, excludeDuts=None, workers=1):
+	allowedDuts=set(dutslist+[focusDut]) if dutslist is not None else None
+	polledDuts,tempDictOfConnections=lldpCrawl([focusDut], hops, allowedDuts, set(excludeDuts or []), workers)
+
+	dictionaryOfConnections,distance=extractNeighborhood(connectionsFromLldpRecords(tempDictOfConnections), focusDut, hops)
+	ixiaDuts=[dut for dut in polledDuts if dut in distance and distance[dut]<hops]
+
+	logging.info("\n > "+str(len(distance))+" devices are within "+str(hops)+" hops of "+focusDut)
+	return ixiaDuts, dictionaryOfConnections
+
+#The below function discovers the lab starting from the seed DUTs: the seeds are polled first, then every new DUT seen as their lldp neighbor, and so on until no new DUTs are found or 'maxDepth' hops are polled.
+#Returns the list of discovered DUTs and the connections between them
+def discoveredLldpInfo(seeds, maxDepth=None, dutslist=None, excludeDuts=None, workers=1):
+	allowedDuts=set(dutslist+seeds) if dutslist is not None else None
+	polledDuts,tempDictOfConnections=lldpCrawl(seeds, maxDepth, allowedDuts, set(excludeDuts or []), workers)
+
+	logging.info("\n > Discovered "+str(len(polledDuts))+" DUTs starting from "+str(seeds)+": "+str(list(polledDuts)))
+	return list(polledDuts), connectionsFromLldpRecords(tempDictOfConnections)
+
+#The below function get ixia details (by finding diff of connected and lldp interfaces). The connected interfaces were already fetched together with the lldp info, so this is only a calculation
 def ixiaConnectionDetailGrabber(dutslist,finalConnectionDetails):
 
 	ixialist=[]
+
+	#Index of the ports of every DUT that are already part of an lldp connection. Built once so that each DUT only needs a set lookup per port
+	lldpPortsByDut={}
+	for connection in finalConnectionDetails:
+		lldpPortsByDut.setdefault(connection.neighbor,set()).add(connection.neighborPort)
+		lldpPortsByDut.setdefault(connection.myDevice,set()).add(connection.port)
 	
 	for i in range(0,len(dutslist)):	
 		try:	
-			#We already have a session during the lldp...using the same session
-			a=connectDevices(dutslist[i])
-			logging.info("  * Getting Ixia Details info from "+dutslist[i])
-			a,=a
-			listofconnections = a.getConnectedIntfs()	
+			#The connected interfaces were fetched with the lldp info. DUTs that were not polled for them yet (eg. when used as a library) are fetched here
+			listofconnections = list(getDutResponse(dutslist[i], 'connectedIntfs'))
 
 			#Removing management and port-channel interfaces from list and changing naming scheme from swat's 'et' to my 'Et'
 			for k in range(0,len(listofconnections)):
@@ -280,71 +847,95 @@ def ixiaConnectionDetailGrabber(dutslist,finalConnectionDetails):
 					listofconnections[k]=listofconnections[k].replace('et','Et')
 
 			#Removing lldp interfaces from ixia interfaces
-			for j in range(0,len(finalConnectionDetails)):
-			   	if finalConnectionDetails[j]['neighbor'] or finalConnectionDetails[j]['myDevice']==dutslist[i]:
-			   		if finalConnectionDetails[j]['neighbor']==dutslist[i]:
-			   			for k in range(0,len(listofconnections)):
-			   				if listofconnections[k]==finalConnectionDetails[j]['neighbor-port']:
-			   					listofconnections[k]=None
-			   		if finalConnectionDetails[j]['myDevice']==dutslist[i]:
-			   			for k in range(0,len(listofconnections)):
-			   				if listofconnections[k]==finalConnectionDetails[j]['port']:
-			   					listofconnections[k]=None
+			lldpPorts=lldpPortsByDut.get(dutslist[i],set())
+			for k in range(0,len(listofconnections)):
+				if listofconnections[k] in lldpPorts:
+					listofconnections[k]=None
 			
-			#Makes a dictionary containing the DUT name and the Ixia ports
+			#Makes a link between the DUT and Ixia for every Ixia port
 			onlyixiaconnections=[]
 			for k in range(0,len(listofconnections)):
-				ixiadict={}
 				if listofconnections[k]!=None:
 					onlyixiaconnections.append(listofconnections[k])
-					ixiadict['neighbor']=dutslist[i]
-					ixiadict['neighbor-port']=listofconnections[k]
-					ixiadict['myDevice']='Ixia' 
-					ixiadict['port']='unknown'
-					ixialist.append(ixiadict)
+					ixialist.append(Link(dutslist[i], listofconnections[k], 'Ixia', 'unknown'))
 		except Exception as e:
 			logging.info("[MESSAGE]: Skipping "+dutslist[i] +" from Ixia connection calculation due to error: "+ str(e))
 			continue
 	
 	return ixialist
 
+#Interface types in the order they are sorted. Both the short and the long names are accepted, eg. Et1 and Ethernet1
+portTypes={'et':0, 'ethernet':0, 'ma':1, 'management':1, 'po':2, 'port-channel':2}
+portNameRegex=re.compile(r'^([a-z\-]+?)([0-9]+(?:/[0-9]+)*)$', re.I)
+
+#The below function encodes an interface name as a tuple of integers: the interface type followed by the slot/port/lane numbers, eg. Et10/1 -> (0, 10, 1).
+#Returns None for names that are not interfaces (eg. 'unknown' for Ixia). The result is cached since the same ports show up again and again
+@functools.lru_cache(maxsize=None)
+def parsePort(port):
+	match=portNameRegex.match(port)
+	if not match or match.group(1).lower() not in portTypes:
+		return None
+	return (portTypes[match.group(1).lower()],)+tuple(int(number) for number in match.group(2).split('/'))
+
+#The below function is the key to sort interfaces in natural order (Et2 before Et10, Et9/4 before Et10/1). Names that are not interfaces are sorted last, by name
+def portSortKey(port):
+	return (parsePort(port) or (len(portTypes),), port)
+
+#The below function compresses a list of interfaces into one label with ranges, eg. [Et1, Et2, Et40] -> 'Et1-2,40' and [Et10/1, Et10/2, Et10/3, Et10/4] -> 'Et10/1-4'.
+#The ports are kept in the given order so that they stay paired with the ports on the other end of the links. Consecutive ports are merged into a range in a single pass
+def compressPorts(ports):
+	runs=[]   #[first port name, first port, last port] of every range
+	for port in ports:
+		parsed=parsePort(port)
+		if runs and port==runs[-1][0] and runs[-1][1]==runs[-1][2]:
+			continue
+		if runs and parsed and runs[-1][2] and parsed[:-1]==runs[-1][2][:-1] and parsed[-1]==runs[-1][2][-1]+1:
+			runs[-1][2]=parsed
+		else:
+			runs.append([port,parsed,parsed])
+
+	labels=[]
+	lastType=None
+	for name,first,last in runs:
+		if first is None:
+			labels.append(name)
+			lastType=None
+			continue
+		label='/'.join(str(number) for number in first[1:])
+		if last!=first:
+			label=label+'-'+str(last[-1])
+		#The interface type (eg. 'Et') is written only when it changes
+		if first[0]!=lastType:
+			label=portNameRegex.match(name).group(1)+label
+		labels.append(label)
+		lastType=first[0]
+
+	return ','.join(labels)
+
 def connectionConsolidator(test):
 	connections = {}
 
 	for t in test:
-		b = t['myDevice']
-		a = t['neighbor']
-		p2 = t['port']
-		p1 = t['neighbor-port']
+		b = t.myDevice
+		a = t.neighbor
+		p2 = t.port
+		p1 = t.neighborPort
 
-		if a+'_'+b not in connections:
-		    connections[a+'_'+b] = {'myDevice':a, 'neighbor':b, 'port':[p1], 'neighbor-port':[p2]}
+		if (a,b) not in connections:
+		    connections[(a,b)] = ([p1],[p2])
 		else:
-			connections[a+'_'+b]['port'].append(p1)
-			connections[a+'_'+b]['neighbor-port'].append(p2)
+			connections[(a,b)][0].append(p1)
+			connections[(a,b)][1].append(p2)
 
 	finallist=[]
 
-	for value in connections.values():
-		finallist.append(value)
-
-	for i,data in enumerate(finallist):
-		data['neighbor-port'].sort()
-		startneighborport=data['neighbor-port'][0]
-		endneighborport=data['neighbor-port'][-1]
+	for (a,b),(ports,neighborports) in connections.items():
+		#The ports of both ends are sorted together so that the n-th port in both labels is the same link
+		links=sorted(zip(neighborports,ports), key=lambda link: (portSortKey(link[0]),portSortKey(link[1])))
+		neighborport=compressPorts([link[0] for link in links])
+		port=compressPorts([link[1] for link in links])
 
-		data['port'].sort()
-		startport=data['port'][0]
-		endport=data['port'][-1]
-
-		if startneighborport!=endneighborport:
-			data['neighbor-port']=startneighborport+'-'+endneighborport.split('Et')[1]
-		else:
-			data['neighbor-port']=startneighborport
-		if startport!=endport:
-			data['port']=startport+'-'+endport.split('Et')[1]
-		else:
-			data['port']=startport
+		finallist.append(Link(b, neighborport, a, port))
 
 	return finallist
 
@@ -358,7 +949,7 @@ def printConnectionsToScreen(dictionaryOfConnections):
 		f.write("\n> The topology in text format is: \n")
 
 		for i in range(0,len(dictionaryOfConnections)):
-			output= dictionaryOfConnections[i]['neighbor'] + '\t(' + dictionaryOfConnections[i]['neighbor-port'] + ')' + '\t--------------------'  + '\t(' + dictionaryOfConnections[i]['port'] + ')' + dictionaryOfConnections[i]['myDevice']
+			output= dictionaryOfConnections[i].neighbor + '\t(' + dictionaryOfConnections[i].neighborPort + ')' + '\t--------------------'  + '\t(' + dictionaryOfConnections[i].port + ')' + dictionaryOfConnections[i].myDevice
 			f.write(output)
 			f.write('\n')
 			logging.info(output)
@@ -374,244 +965,359 @@ def printConnectionsToScreen(dictionaryOfConnections):
 	logging.info("\n ---------------------------------------------------------------------------------------------------------------------- \n ")
 
 
-def automaticGraphGenerator(dictionaryOfConnections, intfInfo):
+#The below function makes a DUT name safe for graphviz since '-' and '.' in the name cause errors in graphviz
+def dotNodeName(name):
+	return name.replace('-','_').replace('.','_')
+
+#The below function returns the Dot language line of one connection. 'labelAttributes' are added to the interface label
+def dotEdge(connection, intfInfo, labelAttributes=''):
+	edge=dotNodeName(connection.neighbor) + ' -> ' + dotNodeName(connection.myDevice)
+	#The below else block is for case when user chose not to include interface labels in topology
+	if intfInfo:
+		edge=edge + ' [ label = "' + connection.neighborPort + '<------>' + connection.port + '"' + labelAttributes + ' ]'
+	return edge+'\n'
+
+#The below function yields the graphviz code of the automatic layout line by line. Joining (or writing) the lines keeps the generation linear in the number of connections
+def automaticGraphLines(dictionaryOfConnections, intfInfo):
 
 	# This part below checks the number of DUTs and connections and based on it, it creates containers for the graphviz code
+	yield '\n\tdigraph finite_state_machine {\t\n\tsize="8,5"\n\tnode [shape = box];\n'
 	if len(dictionaryOfConnections)>20:
-		graph_string='''
-		digraph finite_state_machine {	
-		size="8,5"
-		node [shape = box];
-		rankdir="LR"
-
-		'''
-	if len(dictionaryOfConnections)<=20:
-		graph_string='''
-		digraph finite_state_machine {	
-		size="8,5"
-		node [shape = box];
-
-		'''	
-	
-	#The below block is for handling '-' and '.' being present in DUT name since it causes error in graphviz
-	for i in range(0,len(dictionaryOfConnections)):
-		if '-' in dictionaryOfConnections[i]['neighbor'] or '-' in dictionaryOfConnections[i]['myDevice'] or '.' in dictionaryOfConnections[i]['neighbor'] or '.' in dictionaryOfConnections[i]['myDevice']:
-			if '-' in dictionaryOfConnections[i]['neighbor'] or '.' in dictionaryOfConnections[i]['neighbor']:
-				new_str=string.replace(dictionaryOfConnections[i]['neighbor'], '-', '_')
-				dictionaryOfConnections[i]['neighbor']=new_str
-			if '-' in dictionaryOfConnections[i]['myDevice'] or '.' in dictionaryOfConnections[i]['myDevice']:
-				new_str=string.replace(dictionaryOfConnections[i]['myDevice'], '-', '_')
-				dictionaryOfConnections[i]['myDevice']=new_str
+		yield '\trankdir="LR"\n'
+	yield '\n'
 
 	#The below block is for converting the topology to graphviz format. Adding the connection details to the graphviz container created above
-	for i in range(0,len(dictionaryOfConnections)):
-		if intfInfo:
-			tempvar=dictionaryOfConnections[i]['neighbor'] + ' -> ' + dictionaryOfConnections[i]['myDevice'] + ' [ label = "' + dictionaryOfConnections[i]['neighbor-port'] + '<------>' + dictionaryOfConnections[i]['port'] + '" ]'
-		#The below else block is for case when user chose not to include interface labels in topology
-		else:
-			tempvar=dictionaryOfConnections[i]['neighbor'] + ' -> ' + dictionaryOfConnections[i]['myDevice']
-		graph_string=graph_string+tempvar+'\n'
-
-	graph_string=graph_string+'}'
+	for connection in dictionaryOfConnections:
+		yield dotEdge(connection, intfInfo)
 
-	logging.info("----------------------------------------------------------------------------")
-	logging.info("[MESSAGE] If your device names contains either '.' or '-', it will be replaced by '_' to avoid conflict with other packages\n \n")
+	yield '}'
 
-	logging.info("> Completed:")
+#The below function yields the graphviz code of the leaf-spine layout line by line. 'dictoflevels' has the list of devices of every level from 1 to nooflevels
+def leafSpineGraphLines(dictionaryOfConnections, intfInfo, dictoflevels, nooflevels):
 
-	# The below try-except block is for handling errors in graphviz installation due to all the above dependencies on Mac (linux doesn't have much), I try to install brew and then 'brew install graphviz' since brew (unlike apt-get) is not installed by default.
-	try:
-		s = Source(graph_string, filename="Topology.gv", format="pdf")
-		s.view()
-
-		#Send Email with the script
-		sendEmailSwatExtension()
+	# This part below checks the number of DUTs and connections and based on it, it creates containers for the graphviz code
+	yield '\n\tdigraph finite_state_machine {\t\n\tnode [shape = box];\n'
+	if len(dictionaryOfConnections)>20:
+		yield '\trankdir="LR"\n'
 
+	#The below block is for creating containers in Dot language for all the levels 
+	for j in reversed(range(1,(int(nooflevels)+1))):
+		yield "\n\nsubgraph level"+str(j) +" {\n"
+		if j==1:
+			yield '\trank=max;\n\tnode[style=filled, shape=box,color=green, fontsize=8];\n\n'
+		elif j==2 and int(nooflevels)==2:
+			yield '\trank=min;\n\tnode[style=filled, shape=box,color=red, fontsize=8];\n'
+		elif j==2:
+			yield '\trank=same;\n\tnode[style=filled, shape=box,color=red, fontsize=8];\n'
+		else:
+			yield '\trank=min;\n\tnode[style=filled, shape=box,color=yellow, fontsize=8];\n'
 
-	#The below except block is used to install Xcode-Cli tools, brew and graphviz since Mac requires additional dependencies (if not present already)
-	except Exception as e:
-		logging.info("\n ---------------------------------------------------------------------------------------------------------------------- ")
-		logging.info("[ERROR] Looks like we encountered an error. ERROR is:")
-		logging.info(e)
-		logging.info(" We'll see if installing a few packages fixes it. Please provide your device (Mac/server) password if prompted.")
-		logging.info("---------------------------------------------------------------------------------------------------------------------- ")
-		#Installing Xcode command-line tools for Mac
-		var1= os.system("xcode-select --install")
-		#Installing Brew
-		var=os.system('''/usr/bin/ruby -e "$(curl -fsSL https://raw.githubusercontent.com/Homebrew/install/master/install)"''')
-		#Installing Graphviz using brew
-		var= os.system("brew install graphviz")
-		#This is used to clear the screen ...similar to Ctrl+L in bash
-		os.system('tput reset') 
+		#Adding the devices to each level created above
+		for device in dictoflevels[j]:
+			yield dotNodeName(device)+";\n"
 
+		yield "}"
 
-		s = Source(graph_string, filename="Topology.gv", format="pdf")
-		s.view()
+	#The below block is used for adding the connections to DUTs for graph generation
+	yield '\n\tsubgraph connector{\n'
+	for connection in dictionaryOfConnections:
+		yield dotEdge(connection, intfInfo, ',labelfontsize=0.5')
 
-		#Send Email with the script
-		sendEmailSwatExtension()
-	
+	yield '}}'
 
-	#The below code block if for opening the editable .gv file using Omnigraffle if it is installed on the user's Mac. Else, skip and print 'Script Complete'	
-	try:
-		installationcheckcmd="ls /Applications/ | grep -i OmniGraffle"
-		returned_value = subprocess.call(installationcheckcmd, shell=True)
+def automaticGraphGenerator(dictionaryOfConnections, intfInfo, headless=False):
 
-		if returned_value==1: #That means OmniGraffle is NOT present
-			logging.info("\n [MESSAGE] * The PDF file (graphic topology) and txt file (text) have been generated in current directory! ") #Instead of OmniGraffle not installed message
-			abort("* Script Completed!")
+	with timedStage('dot'):
+		graph_string=''.join(automaticGraphLines(dictionaryOfConnections, intfInfo))
 
-		elif returned_value==0: #That means OmniGraffle is present
-			logging.info("\t * The PDF file (graphic topology) and txt file (text) have been generated in current directory. Also, OmniGraffle has been opened to edit the GV file (graphic topology). Please choose 'Hierarchial' in OmniGraffle to edit it.")
-			subprocess.call(
-    			["/usr/bin/open", "-W", "-n", "-a", "/Applications/OmniGraffle.app","Topology.gv"]
-    		)
+	logging.info("----------------------------------------------------------------------------")
+	logging.info("[MESSAGE] If your device names contains either '.' or '-', it will be replaced by '_' to avoid conflict with other packages\n \n")
 
-	except:
-		abort("* Script Complete!")
-		
+	logging.info("> Completed:")
 
-def graphGeneratorwithLeafSpine(dictionaryOfConnections,intfInfo):
+	renderGraph(graph_string, headless)
 
-	# This part below checks the number of DUTs and connections and based on it, it creates containers for the graphviz code
-	if len(dictionaryOfConnections)>20:
-		graph_string='''
-		digraph finite_state_machine {	
-		node [shape = box];
-		rankdir="LR"
-		'''
+#The below function reads the level of every device from a YAML or JSON file (device: level) or from a CSV file (device,level on each row)
+def loadLevelMap(filePath):
+	try:
+		with open(filePath) as f:
+			content=f.read()
+	except IOError:
+		logging.info("\n[ERROR]: Level file does not exist in "+filePath+" . Please ensure correct file location to proceed \n")
+		abort()
 
-	if len(dictionaryOfConnections)<=20:
-		graph_string='''
-		digraph finite_state_machine {	
-		node [shape = box];
-		'''
+	extension=os.path.splitext(filePath)[1].lower()
+	if extension=='.json':
+		levelMap=json.loads(content)
+	elif extension in ('.yaml','.yml'):
+		if yaml is None:
+			abort("[ERROR]: PyYAML is not installed. Please do 'pip install pyyaml' or provide the levels as JSON or CSV")
+		levelMap=yaml.safe_load(content)
+	else:
+		levelMap={}
+		for row in csv.reader(content.splitlines()):
+			#Skipping empty rows, comments and the header row
+			if len(row)<2 or row[0].strip().startswith('#') or not row[1].strip().isdigit():
+				continue
+			levelMap[row[0].strip()]=row[1].strip()
+
+	return dict((str(device),int(level)) for device,level in levelMap.items())
+
+#The below function converts regex rules such as '^lf=1' or '^fm→2' into a list of (compiled regex, level)
+def parseLevelRules(rules):
+	levelRules=[]
+	for rule in rules or []:
+		pattern,separator,level=rule.replace('→','=').rpartition('=')
+		if not separator or not level.strip().isdigit():
+			abort("[ERROR]: Level rule '"+rule+"' is not in the format 'regex=level'. Eg) '^lf=1'")
+		levelRules.append((re.compile(pattern, re.I), int(level)))
+	return levelRules
+
+#The below function returns the level of a device as per the level map (which has higher priority) or the first matching regex rule. Returns None if the level is not known
+def deviceLevel(device, levelMap=None, levelRules=None):
+	if levelMap and device in levelMap:
+		return levelMap[device]
+	for regex,level in levelRules or []:
+		if regex.search(device):
+			return level
+	return None
+
+#The below function returns True for endpoints that are hosts or Ixia ports instead of DUTs
+def isHostEndpoint(device, port):
+	return device.startswith('Ixia') or port=='unknown'
+
+#The below function infers the level of every device from the connections, without asking the user.
+#In every group of connected DUTs, the DUTs that have hosts/Ixia ports and the least connected DUTs are all leaves. Every other DUT is placed one level above its nearest leaf (spine, super-spine,...)
+#using a breadth first search that starts from all the leaves together. Hosts/Ixia are below the leaves at level 1. Runs in linear time over the connections
+def inferLevels(dictionaryOfConnections):
+	adjacency=collections.OrderedDict()   #DUT -> neighboring DUTs
+	hosts=[]
+	hostDuts=set()   #DUTs that have hosts/Ixia ports
+	for connection in dictionaryOfConnections:
+		ends=connection.endpoints()
+		for (device,port),(otherDevice,otherPort) in (ends,ends[::-1]):
+			if isHostEndpoint(device, port):
+				if device not in hosts:
+					hosts.append(device)
+				continue
+			adjacency.setdefault(device,set())
+			if isHostEndpoint(otherDevice, otherPort):
+				hostDuts.add(device)
+			else:
+				adjacency[device].add(otherDevice)
 
-	nooflevels=input("Please enter the number of levels in your topology. Eg) Leaf-Spine is 2 levels and Leaf-Spine-Superspine is 3 levels. (Enter a integer:) ")
+	leaves=[]
+	seen=set()
+	for device in adjacency:
+		if device in seen:
+			continue
+		component=[device]
+		seen.add(device)
+		for member in component:
+			for neighbor in adjacency[member]:
+				if neighbor not in seen:
+					seen.add(neighbor)
+					component.append(neighbor)
+		lowestDegree=min(len(adjacency[member]) for member in component)
+		leaves.extend(member for member in component if member in hostDuts or len(adjacency[member])==lowestDegree)
+
+	levels=dict((host,1) for host in hosts)
+	queue=collections.deque()
+	for leaf in leaves:
+		levels[leaf]=2 if hosts else 1
+		queue.append(leaf)
+	while queue:
+		device=queue.popleft()
+		for neighbor in adjacency[device]:
+			if neighbor not in levels:
+				levels[neighbor]=levels[device]+1
+				queue.append(neighbor)
+
+	return levels
+
+#The below function returns the level map for the leaf-spine layout from the level file (or 'auto'). The inferred levels are overridden by the regex rules, if any.
+#With inferMissing (eg. in headless mode), the inferred levels are also used for devices missing in the level file so that nobody is asked
+def resolveLevelMap(dictionaryOfConnections, levelsFile, levelRules, inferMissing=False):
+	levelMap=None
+	if levelsFile=='auto' or inferMissing:
+		levelMap=inferLevels(dictionaryOfConnections)
+		for device in levelMap:
+			levelMap[device]=deviceLevel(device, None, levelRules) or levelMap[device]
+	if levelsFile and levelsFile!='auto':
+		levelMap=dict(levelMap or {})
+		levelMap.update(loadLevelMap(levelsFile))
+	return levelMap
+
+def graphGeneratorwithLeafSpine(dictionaryOfConnections,intfInfo,levelMap=None,levelRules=None,headless=False):
+
+	#The below block is used for getting the list of devices in the order in which they show up in the connections
+	devices=[]
+	for connection in dictionaryOfConnections:
+		devices.append(connection.neighbor)
+		devices.append(connection.myDevice)
+	devices=list(collections.OrderedDict.fromkeys(devices))
+
+	#The levels of devices given in the level file or regex rules are used directly. The user is asked only for the remaining devices
+	knownLevels={}
+	for device in devices:
+		level=deviceLevel(device, levelMap, levelRules)
+		if level is not None:
+			knownLevels[device]=level
+
+	#In headless mode nothing is asked: a topology without devices gives an empty graph and unknown levels end the script
+	unknownDevices=[device for device in devices if device not in knownLevels]
+	if headless and unknownDevices:
+		logging.info("[ERROR]: The levels of "+str(unknownDevices)+" are not known. Please give them using --levels or --levels-regex")
+		abort('* Script Complete')
+	elif headless and not devices:
+		nooflevels='1'
+	elif devices and not unknownDevices:
+		nooflevels=str(max(knownLevels.values()))
+	else:
+		nooflevels=input("Please enter the number of levels in your topology. Eg) Leaf-Spine is 2 levels and Leaf-Spine-Superspine is 3 levels. (Enter a integer:) ")
 
-	alreadyadded=[]
 	dictoflevels={}
 
 	#The below block is used for getting the levels of DUTs (.ie. whether leaf/spine/super-spine/...) from user
 	for i in range(1,(int(nooflevels)+1)):
 		dictoflevels[i]=[]
 	try:
-		for i in range(0,len(dictionaryOfConnections)):
-			if dictionaryOfConnections[i]['neighbor']==dictionaryOfConnections[i]['myDevice']:
-				if dictionaryOfConnections[i]['neighbor'] not in alreadyadded:
-					alreadyadded.append(dictionaryOfConnections[i]['neighbor'])
-					value=input ("Enter the level/hierarchy in range of 1 to "+nooflevels+" (with 1 being lowest) of "+dictionaryOfConnections[i]['neighbor'] +": ")
-					dictoflevels[int(value)].append(dictionaryOfConnections[i]['neighbor'])
+		for device in devices:
+			if device in knownLevels:
+				value=knownLevels[device]
 			else:
-				if dictionaryOfConnections[i]['neighbor'] not in alreadyadded:
-					alreadyadded.append(dictionaryOfConnections[i]['neighbor'])
-					value=input ("Enter the level/hierarchy in range of 1 to "+nooflevels+" (with 1 being lowest) of "+dictionaryOfConnections[i]['neighbor'] +": ")
-					dictoflevels[int(value)].append(dictionaryOfConnections[i]['neighbor'])
-				if dictionaryOfConnections[i]['myDevice'] not in alreadyadded:
-					alreadyadded.append(dictionaryOfConnections[i]['myDevice'])
-					value=input ("Enter the level/hierarchy in range of 1 to "+nooflevels+" (with 1 being lowest) of "+dictionaryOfConnections[i]['myDevice'] +": ")
-					dictoflevels[int(value)].append(dictionaryOfConnections[i]['myDevice'])		
+				value=input ("Enter the level/hierarchy in range of 1 to "+nooflevels+" (with 1 being lowest) of "+device +": ")
+			dictoflevels[int(value)].append(device)
 	except KeyError as e:
 		logging.info('[ERROR] The entered value is outside the range of total levels. Please rerun again...')
 		abort('* Script Complete')
 		
 
-	#The below block is for handling '-' and '.' being present in DUT name since it causes error in graphviz
-	for i in range(0,len(dictionaryOfConnections)):
-		if '-' in dictionaryOfConnections[i]['neighbor'] or '-' in dictionaryOfConnections[i]['myDevice'] or '.' in dictionaryOfConnections[i]['neighbor'] or '.' in dictionaryOfConnections[i]['myDevice']:
-			if '-' in dictionaryOfConnections[i]['neighbor'] or '.' in dictionaryOfConnections[i]['neighbor']:
-				if '-' in dictionaryOfConnections[i]['neighbor']:
-					new_str=string.replace(dictionaryOfConnections[i]['neighbor'], '-', '_')
-				if '.' in dictionaryOfConnections[i]['neighbor']:
-					new_str=string.replace(dictionaryOfConnections[i]['neighbor'], '.', '_')
-				dictionaryOfConnections[i]['neighbor']=new_str
-			if '-' in dictionaryOfConnections[i]['myDevice'] or '.' in dictionaryOfConnections[i]['myDevice']:
-				if '-' in dictionaryOfConnections[i]['myDevice']:
-					new_str=string.replace(dictionaryOfConnections[i]['myDevice'], '-', '_')
-				if '.' in dictionaryOfConnections[i]['myDevice']:
-					new_str=string.replace(dictionaryOfConnections[i]['myDevice'], '.', '_')
-				dictionaryOfConnections[i]['myDevice']=new_str
-
+	with timedStage('dot'):
+		graph_string=''.join(leafSpineGraphLines(dictionaryOfConnections, intfInfo, dictoflevels, nooflevels))
 
-	#The below block is for creating containers in Dot language for all the levels 
-	for j in reversed(range(1,(int(nooflevels)+1))):
-		graph_string=graph_string+"\n\nsubgraph level"+str(j) +" {"
-		if j==1:
-			graph_string=graph_string+'''
-			rank=max;
-			node[style=filled, shape=box,color=green, fontsize=8];
-
-			'''
-		elif j==2:
-			if int(nooflevels)==2:
-				graph_string=graph_string+'''
-				rank=min;
-				node[style=filled, shape=box,color=red, fontsize=8];
-				'''
-			else:
-				graph_string=graph_string+'''
-				rank=same;
-				node[style=filled, shape=box,color=red, fontsize=8];
-				'''				
-		else:
-			graph_string=graph_string+'''
-			rank=min;
-			node[style=filled, shape=box,color=yellow, fontsize=8];
-			'''
-
-		#Adding the devices to each level created above
-		for k in range(0,len(dictoflevels[j])):
-
-			#Handling '-' or '.' present in the name
-			if '-' in dictoflevels[j][k] or '.' in dictoflevels[j][k]: 
-				if '-' in dictoflevels[j][k]:
-					new_str=string.replace(dictoflevels[j][k], '-', '_')
-					dictoflevels[j][k]=new_str
-				if '.' in dictoflevels[j][k]:
-					new_str=string.replace(dictoflevels[j][k], '.', '_')
-					dictoflevels[j][k]=new_str
+	logging.info("----------------------------------------------------------------------------")
+	logging.info("[MESSAGE] If your device names contains either '.' or '-', it will be replaced by '_' to avoid conflict with other packages")
+	logging.info("[MESSAGE] If you get a blank file as output, please verify your choice for device levels. Your choice may have given impossible to comprehend/design for our tool \n \n")
 
-			graph_string=graph_string+dictoflevels[j][k]+";\n"
+	logging.info("> Completed: \n")
 
+	renderGraph(graph_string, headless, leafSpine=True)
 
-		graph_string=graph_string+"}"
+#Options for rendering the graphviz code. mainFunc fills these in from the command line flags
+renderOptions={'renderCache':True, 'engine':'dot', 'leafSpineEngine':'dot', 'formats':['pdf'], 'cacheDir':None, 'renderTimeout':300}
 
+#Faster layout engine to fall back to when rendering with an engine takes longer than the render timeout
+fasterLayoutEngine={'dot':'sfdp', 'neato':'sfdp', 'fdp':'sfdp', 'circo':'sfdp', 'twopi':'sfdp', 'sfdp':None}
 
-	#The below block is used for adding the connections to DUTs for graph generation
+#The below function picks the layout engine based on the number of devices and connections. 'dot' gives the best hierarchical layout but takes minutes for labs with hundreds of DUTs
+def chooseLayoutEngine(dictionaryOfConnections):
+	devices=set()
+	for connection in dictionaryOfConnections:
+		devices.add(connection.neighbor)
+		devices.add(connection.myDevice)
 
-	graph_string=graph_string+'''
-	subgraph connector{
-	'''	
-	#The below loop is for converting the topology to graphviz format. Adding the connection details to the graphviz container created above
-	for i in range(0,len(dictionaryOfConnections)):
-		if intfInfo:
-			tempvar=dictionaryOfConnections[i]['neighbor'] + ' -> ' + dictionaryOfConnections[i]['myDevice'] + ' [ label = "' + dictionaryOfConnections[i]['neighbor-port'] + '<------>' + dictionaryOfConnections[i]['port'] + '",labelfontsize=0.5 ]'
-		#The below else block is for case when user chose not to include interface labels in topology		
+	if len(devices)<=100 and len(dictionaryOfConnections)<=300:
+		engine='dot'
+	elif len(devices)<=300:
+		engine='neato'
+	else:
+		engine='sfdp'
+	logging.info("[MESSAGE] Using '"+engine+"' layout for "+str(len(devices))+" devices and "+str(len(dictionaryOfConnections))+" connections")
+	return engine
+
+#The below function renders the graphviz code to '<filename>.<format>' and returns the path of the rendered file along with the layout engine that was used. It runs in a separate worker process for every format, so it only uses its arguments.
+#Rendered files are kept in '<cacheDir>/render' by the hash of the graphviz code, format and engine, so an unchanged topology is not rendered again.
+#If rendering takes longer than 'timeout' seconds, it is rendered again using a faster layout engine
+def renderToFile(graph_string, filename="Topology.gv", format="pdf", engine="dot", cacheDir=None, timeout=0):
+	renderedFile=filename+'.'+format
+
+	cachedFile=None
+	if cacheDir:
+		digest=hashlib.sha256((engine+'\n'+format+'\n'+graph_string).encode('utf-8')).hexdigest()
+		#The directory is normally created by renderFormats before the workers start. exist_ok since other workers may create it at the same time
+		os.makedirs(os.path.join(cacheDir,'render'), exist_ok=True)
+		cachedFile=os.path.join(cacheDir,'render',digest+'.'+format)
+		if os.path.isfile(cachedFile):
+			shutil.copyfile(cachedFile, renderedFile)
+			return renderedFile, engine
+
+	#Using pipe() so that parallel renders of different formats do not write the same source file. Since pipe() has no timeout, the graphviz binary is run directly when there is a timeout
+	if timeout:
+		try:
+			rendered=subprocess.run([engine, '-T'+format], input=graph_string.encode('utf-8'), stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout, check=True).stdout
+		except subprocess.TimeoutExpired:
+			if not fasterLayoutEngine.get(engine):
+				raise
+			#The faster render is cached only under its own engine, so that a later run (eg. with a larger timeout) still tries the requested engine
+			return renderToFile(graph_string, filename, format, fasterLayoutEngine[engine], cacheDir, timeout)
+	else:
+		rendered=Source(graph_string, format=format, engine=engine).pipe()
+
+	with open(renderedFile,'wb') as f:
+		f.write(rendered)
+	if cachedFile:
+		shutil.copyfile(renderedFile, cachedFile)
+	return renderedFile, engine
+
+#The below function writes the graphviz code of every (filename, graph_string) in 'sources' and renders all of them to all the requested formats in parallel worker processes.
+#Returns the list of rendered files of every source, in the same order as 'sources'.
+#Leaf-spine graphs use 'dot' without falling back to a faster engine, since their levels are rank=min/max/same subgraphs that only 'dot' draws
+def renderFormats(sources, leafSpine=False):
+	with timedStage('render'):
+		for filename,graph_string in sources:
+			with open(filename,'w') as f:
+				f.write(graph_string)
+
+		formats=renderOptions['formats']
+		engine=renderOptions['engine']
+		timeout=renderOptions['renderTimeout']
+		if leafSpine:
+			engine=renderOptions['leafSpineEngine']
+			if engine=='dot':
+				timeout=0
+			else:
+				logging.info("[MESSAGE] The leaf-spine levels are only drawn by the 'dot' layout. They are dropped since the '"+engine+"' layout is used")
+		renderArguments=(renderOptions['cacheDir'] if renderOptions['renderCache'] else None, timeout)
+		if renderArguments[0]:
+			os.makedirs(os.path.join(renderArguments[0],'render'), exist_ok=True)
+		jobs=[(graph_string, filename, format) for filename,graph_string in sources for format in formats]
+		if len(jobs)==1:
+			results=[renderToFile(graph_string, filename, format, engine, *renderArguments) for graph_string,filename,format in jobs]
 		else:
-			tempvar=dictionaryOfConnections[i]['neighbor'] + ' -> ' + dictionaryOfConnections[i]['myDevice']		
-		graph_string=graph_string+tempvar+'\n'
+			with ProcessPoolExecutor(max_workers=min(len(jobs), os.cpu_count() or 1)) as executor:
+				futures=[executor.submit(renderToFile, graph_string, filename, format, engine, *renderArguments) for graph_string,filename,format in jobs]
+				results=[future.result() for future in futures]
 
-	graph_string=graph_string+'}}'
+		for renderedFile,usedEngine in results:
+			if usedEngine!=engine:
+				logging.info("[MESSAGE] Rendering "+renderedFile+" using '"+engine+"' took more than "+str(renderOptions['renderTimeout'])+" seconds. Used the faster '"+usedEngine+"' layout instead")
 
-	logging.info("----------------------------------------------------------------------------")
-	logging.info("[MESSAGE] If your device names contains either '.' or '-', it will be replaced by '_' to avoid conflict with other packages")
-	logging.info("[MESSAGE] If you get a blank file as output, please verify your choice for device levels. Your choice may have given impossible to comprehend/design for our tool \n \n")
+		renderedFiles=[renderedFile for renderedFile,usedEngine in results]
+		return [renderedFiles[i:i+len(formats)] for i in range(0,len(renderedFiles),len(formats))]
 
-	logging.info("> Completed: \n")
+#The below function renders the graphviz code to Topology.gv.pdf (or the formats chosen using --formats). Unless headless, it opens the first rendered file, asks about sending an email and opens OmniGraffle if it is installed.
+#In headless mode (eg. when run from cron), the files are only rendered so that nothing waits for a human
+def renderGraph(graph_string, headless=False, leafSpine=False):
 
 	# The below try-except block is for handling errors in graphviz installation due to all the above dependencies on Mac (linux doesn't have much), I try to install brew and then 'brew install graphviz' since brew (unlike apt-get) is not installed by default.
 	try:
-		s = Source(graph_string, filename="Topology.gv", format="pdf")
-		s.view()
+		renderedFiles=renderFormats([("Topology.gv", graph_string)], leafSpine)[0]
+		if not headless:
+			graphviz.view(renderedFiles[0])
+
+			#Send Email with the script
+			sendEmailSwatExtension(renderedFiles)
 
-		#Send Email with the script
-		sendEmailSwatExtension()
 
 	#The below except block is used to install Xcode-Cli tools, brew and graphviz since Mac requires additional dependencies (if not present already)
 	except Exception as e:
 		logging.info("\n ---------------------------------------------------------------------------------------------------------------------- ")
 		logging.info("[ERROR] Looks like we encountered an error. ERROR is:")
 		logging.info(e)
+		if headless:
+			#Installing packages needs a password, so it is not attempted in headless mode
+			abort("* Script Complete!")
 		logging.info(" We'll see if installing a few packages fixes it. Please provide your device (Mac/server) password if prompted.")
 		logging.info("---------------------------------------------------------------------------------------------------------------------- ")
 		#Installing Xcode command-line tools for Mac
@@ -624,20 +1330,25 @@ def graphGeneratorwithLeafSpine(dictionaryOfConnections,intfInfo):
 		os.system('tput reset') 
 
 
-		s = Source(graph_string, filename="Topology.gv", format="pdf")
-		s.view()
+		renderedFiles=renderFormats([("Topology.gv", graph_string)], leafSpine)[0]
+		graphviz.view(renderedFiles[0])
 
 		#Send Email with the script
-		sendEmailSwatExtension()
+		sendEmailSwatExtension(renderedFiles)
 
-	#The below code block if for opening the editable .gv file using Omnigraffle if it is installed on the user's Mac. Else, skip and print 'Script Complete'			
+	if headless:
+		logging.info("\n [MESSAGE] * The graphic topology ("+', '.join(renderOptions['formats'])+") and txt file (text) have been generated in current directory! ")
+		logging.info("* Script Complete!")
+		return
+
+	#The below code block if for opening the editable .gv file using Omnigraffle if it is installed on the user's Mac. Else, skip and print 'Script Complete'	
 	try:
 		installationcheckcmd="ls /Applications/ | grep -i OmniGraffle"
 		returned_value = subprocess.call(installationcheckcmd, shell=True)
 
 		if returned_value==1: #That means OmniGraffle is NOT present
-			logging.info("[MESSAGE] The PDF file (graphic topology) and txt file (text) have been generated in current directory! ") #Instead of OmniGraffle not installed message
-			abort("* Script Completed! ")
+			logging.info("\n [MESSAGE] * The PDF file (graphic topology) and txt file (text) have been generated in current directory! ") #Instead of OmniGraffle not installed message
+			abort("* Script Completed!")
 
 		elif returned_value==0: #That means OmniGraffle is present
 			logging.info("\t * The PDF file (graphic topology) and txt file (text) have been generated in current directory. Also, OmniGraffle has been opened to edit the GV file (graphic topology). Please choose 'Hierarchial' in OmniGraffle to edit it.")
@@ -647,22 +1358,98 @@ def graphGeneratorwithLeafSpine(dictionaryOfConnections,intfInfo):
 
 	except:
 		abort("* Script Complete!")
-		
 
-def sendEmailSwatExtension():
+#The below function splits the connections into partitions that can be rendered on their own. Returns an ordered dictionary of partition name to its connections.
+#'component' makes one partition for every group of connected DUTs (hosts/Ixia do not join groups). 'owner' makes one partition for every owner in 'owners' (dut to owner), with links between owners shown in both partitions
+def partitionConnections(dictionaryOfConnections, partitionBy, owners=None):
+	partitions=collections.OrderedDict()
+
+	if partitionBy=='owner':
+		for connection in dictionaryOfConnections:
+			connectionOwners=[]
+			for device in (connection.neighbor,connection.myDevice):
+				owner=(owners or {}).get(device)
+				if owner and owner not in connectionOwners:
+					connectionOwners.append(owner)
+			for owner in connectionOwners or ['unowned']:
+				partitions.setdefault(owner,[]).append(connection)
+		return partitions
+
+	#Grouping the DUTs into connected components using union-find. Hosts/Ixia are left out since they would join unrelated DUTs together
+	parent={}
+	def find(device):
+		parent.setdefault(device,device)
+		while parent[device]!=device:
+			parent[device]=parent[parent[device]]
+			device=parent[device]
+		return device
+
+	duts=[]
+	for connection in dictionaryOfConnections:
+		ends=[device for device,port in connection.endpoints() if not isHostEndpoint(device, port)]
+		duts.append(ends[0] if ends else connection.neighbor)
+		if len(ends)==2:
+			parent[find(ends[0])]=find(ends[1])
+
+	#Naming every component after the first DUT that shows up in it
+	names={}
+	for connection,dut in zip(dictionaryOfConnections,duts):
+		root=find(dut)
+		names.setdefault(root,dut)
+		partitions.setdefault(names[root],[]).append(connection)
+	return partitions
+
+#The below function returns the graphviz code of one partition. With a level map that has every device, the leaf-spine layout is used. Else, the automatic layout is used
+def partitionGraphSource(dictionaryOfConnections, intfInfo, levelMap=None):
+	if not levelMap:
+		return ''.join(automaticGraphLines(dictionaryOfConnections, intfInfo))
+
+	nooflevels=max(levelMap.values())
+	dictoflevels=dict((i,[]) for i in range(1,nooflevels+1))
+	devices=[]
+	for connection in dictionaryOfConnections:
+		devices.append(connection.neighbor)
+		devices.append(connection.myDevice)
+	for device in collections.OrderedDict.fromkeys(devices):
+		dictoflevels[levelMap[device]].append(device)
+	return ''.join(leafSpineGraphLines(dictionaryOfConnections, intfInfo, dictoflevels, str(nooflevels)))
+
+#The below function renders every partition to 'Topology-<partition>.gv.<format>' in parallel and writes TopologyIndex.html with links to all of them.
+#Since rendered files are cached by their graphviz code, only the partitions whose links changed are rendered again
+def renderPartitions(partitions, intfInfo, levelMap=None, headless=False):
+	sources=[]
+	with timedStage('dot'):
+		for name,connections in partitions.items():
+			sources.append(('Topology-'+dotNodeName(name)+'.gv', partitionGraphSource(connections, intfInfo, levelMap)))
+
+	logging.info("> Rendering "+str(len(sources))+" partitions:")
+	renderedFiles=renderFormats(sources, bool(levelMap))
+
+	with open('TopologyIndex.html','w') as f:
+		f.write('<html>\n<head><title>Topology</title></head>\n<body>\n<h2>Topology partitions</h2>\n<ul>\n')
+		for (name,connections),(filename,graph_string),files in zip(partitions.items(),sources,renderedFiles):
+			links=' '.join('<a href="'+html.escape(renderedFile)+'">'+html.escape(renderedFile.rsplit('.',1)[1])+'</a>' for renderedFile in files)
+			f.write('<li>'+html.escape(name)+' ('+str(len(connections))+' links): '+links+' <a href="'+html.escape(filename)+'">gv</a></li>\n')
+		f.write('</ul>\n</body>\n</html>\n')
+
+	logging.info("\n [MESSAGE] * The graphic topology of every partition and TopologyIndex.html linking them have been generated in current directory! ")
+	if not headless:
+		graphviz.view('TopologyIndex.html')
+
+def sendEmailSwatExtension(renderedFiles=('Topology.gv.pdf',)):
 	emailChoice=input("Do you need to send the generated files to your email? (yes/no). Unless you want to scp the files out, it is Recommended to type 'yes': " )
 	if emailChoice=='no' or emailChoice=='n' or emailChoice=='N':
 		return
 	else:
 		try:
-			#Compressing the 3 files into a zip file
+			#Compressing the text, graphviz and rendered files into a zip file
 			logging.info("---------------------------------------------------------")
 			logging.info("[MESSAGE] Compressing the files into zip: ")
-			os.system('zip topology_generated.zip TopologyGenerated.txt Topology.gv.pdf Topology.gv')
+			os.system('zip topology_generated.zip TopologyGenerated.txt '+' '.join(renderedFiles)+' Topology.gv')
 			logging.info("---------------------------------------------------------\n")
 
 			emailTo=input("Enter your Arista email address (To address): ")
-			emailSubj= "Topology generation files- Graphic PDF, Graphic GV and Text"
+			emailSubj= "Topology generation files- Graphic "+'/'.join(format.upper() for format in renderOptions['formats'])+", Graphic GV and Text"
 			emailBody='TopologyGenerated.txt'
 			emailAttachment='topology_generated.zip'
 			
@@ -683,17 +1470,53 @@ def sendEmailSwatExtension():
 			return
 
 #The main function
-def mainFunc(username, poolname, filePath, graphrequired, intfInfo, excludeDuts, includeIxiaPorts, consolidateInterfaces):
+def mainFunc(username, poolname, filePath, graphrequired, intfInfo, excludeDuts, includeIxiaPorts, consolidateInterfaces, workers=1, collector='swat', eapiOptions=None, recordDir=None, replayDir=None, cacheOptions=None, levelsFile=None, levelRules=None, headless=False, renderCache=True, formats=('pdf',), engine='auto', renderTimeout=300, partitionBy=None, focusDut=None, hops=1, discoverSeeds=None, maxDepth=None, allOwners=False, hostnameRegex=None):
+
+	collectionOptions['collector']=collector
+	collectionOptions['workers']=workers
+	collectionOptions['fetchConnectedIntfs']=includeIxiaPorts
+	if eapiOptions:
+		collectionOptions.update(eapiOptions)
+	collectionOptions['replayDir']=replayDir
+	if cacheOptions:
+		collectionOptions.update(cacheOptions)
+	collectionOptions['recordDir']=recordDir
+	if recordDir and not os.path.isdir(recordDir):
+		os.makedirs(recordDir)
+	if hostnameRegex:
+		setHostnamePatterns(hostnameRegex)
+
+	#username and poolname can also be lists of users and pools. With more than one user or pool (or allOwners), the topology of every user is generated from one collection of all their DUTs
+	usernames=[username] if isinstance(username,str) else list(username or [])
+	poolnames=[poolname] if isinstance(poolname,str) else list(poolname)
+	batchMode=allOwners or len(usernames)>1 or len(poolnames)>1
+	dutsByOwner=None
+	userGiven=bool(usernames) or allOwners
 
 	#The below part is used to handle cases of username and/or filePathation provided
-	if not username and not filePath:
+	if focusDut and not userGiven and not filePath:
+		logging.info("\n \n ----------------------------------------------------------------------------------------------------------------------  \n")
+		logging.info(('[MESSAGE]: Username and file have not been provided. Using all DUTs within '+str(hops)+' hops of '+focusDut+' for Topology generation'))
+		finalListOfDuts= None
+
+	elif discoverSeeds and not userGiven and not filePath:
+		logging.info("\n \n ----------------------------------------------------------------------------------------------------------------------  \n")
+		logging.info(('[MESSAGE]: Username and file have not been provided. Discovering the DUTs starting from '+str(discoverSeeds)+' for Topology generation'))
+		finalListOfDuts= None
+
+	elif replayDir and not userGiven and not filePath:
+		logging.info("\n \n ----------------------------------------------------------------------------------------------------------------------  \n")
+		logging.info(('[MESSAGE]: Username and file have not been provided. Using the DUTs recorded in '+replayDir+' for Topology generation'))
+		finalListOfDuts= recordedDutList(replayDir)
+
+	elif not userGiven and not filePath:
 		logging.info("\n \n ----------------------------------------------------------------------------------------------------------------------  \n")
 		logging.info(('[MESSAGE]: Username has not been provided. Using file for Topology generation'))
 		filePath = os.path.expanduser('~/setup.txt') #Default File location
 		logging.info(('[MESSAGE]: Default file at ~/setup.txt is used since custom file locaton as not been provided using -f flag'))
 		finalListOfDuts= fileDutList(username, filePath)
 
-	elif not username and filePath:
+	elif not userGiven and filePath:
 		logging.info("\n \n ----------------------------------------------------------------------------------------------------------------------  \n")
 		logging.info(('[MESSAGE]: Username has not been provided. Using file for Topology generation'))
 		finalListOfDuts= fileDutList(username, filePath)
@@ -703,34 +1526,82 @@ def mainFunc(username, poolname, filePath, graphrequired, intfInfo, excludeDuts,
 			logging.info("\n \n ----------------------------------------------------------------------------------------------------------------------  \n")
 			logging.info(('[WARNING]: You have provided both a DUTS list file as well as username. Username has higher priority for Topology generation and will be considered. Ignoring the DUT file info...'))
 
-		finalListOfDuts= userDutList(username, poolname) #login to us128 and grab the list of DUTs owned by current user and return a list containing the DUTs
+		if batchMode:
+			dutsByOwner=ownerDutLists(usernames, poolnames, allOwners) #grab the Art inventory once and find the DUTs of all the users
+			finalListOfDuts=list(collections.OrderedDict.fromkeys(dut for duts in dutsByOwner.values() for dut in duts))
+		else:
+			finalListOfDuts= userDutList(usernames[0], poolnames[0]) #login to us128 and grab the list of DUTs owned by current user and return a list containing the DUTs
 
 
 	#This is used to remove the excludeDuts DUTs from the topology generation
-	if excludeDuts:
+	if excludeDuts and finalListOfDuts is not None:
 		finalListOfDuts=excludedFromList(finalListOfDuts,excludeDuts)	
 
 	warningMessage() #Will warn users about the list of reasons why the script could fail
+
 	  	
-	finalConnectionDetails= lldpInfo(finalListOfDuts) #does the work of grabbing lldp info "and connected interfaces" from all the DUTs, and removing duplicates 
+	if focusDut:
+		finalListOfDuts, finalConnectionDetails= focusedLldpInfo(focusDut, hops, finalListOfDuts, excludeDuts, workers) #polls only the DUTs around the focus DUT
+	elif discoverSeeds:
+		finalListOfDuts, finalConnectionDetails= discoveredLldpInfo(discoverSeeds, maxDepth, finalListOfDuts, excludeDuts, workers) #polls the seeds and then their neighbors until no new DUTs are found
+	else:
+		finalConnectionDetails= lldpInfo(finalListOfDuts, workers) #does the work of grabbing lldp info "and connected interfaces" from all the DUTs, and removing duplicates 
 
   	#This is used to include Ixia Connections as well based on user flag for ixia
 	if not includeIxiaPorts:
 		finalConnectionDetails=finalConnectionDetails	
 	else:
-		listOfIxiaConnections= ixiaConnectionDetailGrabber(finalListOfDuts, finalConnectionDetails) 
+		with timedStage('ixia'):
+			listOfIxiaConnections= ixiaConnectionDetailGrabber(finalListOfDuts, finalConnectionDetails) 
 		finalConnectionDetails=finalConnectionDetails+listOfIxiaConnections
 
 	#This is used to consolidate the links between same two devices
 	if consolidateInterfaces:
-		finalConnectionDetails=connectionConsolidator(finalConnectionDetails)		
+		with timedStage('consolidation'):
+			finalConnectionDetails=connectionConsolidator(finalConnectionDetails)		
 
-	printConnectionsToScreen(finalConnectionDetails)
+	with timedStage('text'):
+		printConnectionsToScreen(finalConnectionDetails)
 
 	if not graphrequired:
 		logging.info('[MESSAGE]: Graph not generated due to user choice')
 		logging.info("* Text file named 'TopologyGenerated.txt' has been created on the same directory containing LLDP info")
 		abort('* Script Complete!')
+
+	renderOptions['renderCache']=renderCache
+	renderOptions['cacheDir']=collectionOptions['cacheDir']
+	renderOptions['formats']=list(formats)
+	renderOptions['renderTimeout']=renderTimeout
+	#The size based choice is only for the automatic layout. Leaf-spine graphs need 'dot' for their levels
+	renderOptions['leafSpineEngine']='dot' if engine=='auto' else engine
+	if engine!='auto':
+		renderOptions['engine']=engine
+	elif not (levelsFile or levelRules):
+		renderOptions['engine']=chooseLayoutEngine(finalConnectionDetails)
+
+	if partitionBy or dutsByOwner is not None:
+		owners=None
+		if dutsByOwner is not None:
+			partitionBy='owner'
+			owners=dict((dut,owner) for owner,duts in dutsByOwner.items() for dut in duts)
+		elif partitionBy=='owner':
+			owners=dict((dut,info['owner']) for poolname in poolnames for dut,info in artInventory(poolname).items())
+		levelMap=None
+		if levelsFile or levelRules:
+			levelMap=resolveLevelMap(finalConnectionDetails, levelsFile, parseLevelRules(levelRules), inferMissing=True)
+		partitions=partitionConnections(finalConnectionDetails, partitionBy, owners)
+		if dutsByOwner is not None:
+			#Only the topologies of the users asked for are rendered
+			partitions=collections.OrderedDict((owner,partitions[owner]) for owner in dutsByOwner if owner in partitions)
+		renderPartitions(partitions, intfInfo, levelMap, headless)
+		if not headless:
+			abort('* Script Complete!')
+	elif levelsFile or levelRules:
+		levelRules=parseLevelRules(levelRules)
+		levelMap=resolveLevelMap(finalConnectionDetails, levelsFile, levelRules, headless)
+		graphGeneratorwithLeafSpine(finalConnectionDetails, intfInfo, levelMap, levelRules, headless) #generates a graphical representation with location levels given in the level file or rules
+	elif headless:
+		automaticGraphGenerator(finalConnectionDetails, intfInfo, headless) #generates a graphical representation with random location of DUTs without asking anything
 	else:
 		while True:
 			userchoice = input("Do you have a preference of Leaf-Spine for the DUTs (yes/no)? Type 'no' if you have no clue it means:  ")
@@ -754,18 +1625,66 @@ if __name__== "__main__":
 
 	# Parsing Options
 	parser = argparse.ArgumentParser(description='Used to generate topology incl. ixia connection by taking username as input',formatter_class=argparse.RawDescriptionHelpFormatter)
-	parser.add_argument('-u', '--user', help="Username of user who's topology is needed")
-	parser.add_argument('-p', '--pool', default='LabTracker', help='Specify the pool for the above user (default = LabTracker)')
+	parser.add_argument('-u', '--user', nargs='+', help="Username of user who's topology is needed. With more than one user, the DUTs of all users are polled once and a topology is generated for every user")
+	parser.add_argument('-p', '--pool', nargs='+', default=['LabTracker'], help='Specify the pool for the above user. DUTs from all the given pools are used (default = LabTracker)')
+	parser.add_argument('--all-owners', action='store_true', help='Generate the topology of every DUT owner in the pools, polling every DUT once')
 	parser.add_argument('-f', '--file', help='Setup File / DUT List to Load (default = ~/setup.txt)')
 	parser.add_argument('-g', '--graph', action='store_false', help= "Add this flag if you DON'T want graph to be generated(default = generated)")
 	parser.add_argument('-i', '--ixia', action='store_false', help='Add this flag to exclude Ixia Ports from topology(default = included)')
 	parser.add_argument('-c', '--consolidation', action='store_false', help="Add this flag if you DON'T want interfaces between two devices to be grouped/consolidated (default = consolidated)")
 	parser.add_argument('-n', '--ifNames', action='store_false', help="Add this flag if you DON'T want interface names to show up in graph (default = interface names are shown)")
 	parser.add_argument('-x', '--exclude',nargs='+', help='Exclude the following DUTs during topology formation')
+	parser.add_argument('-w', '--workers', type=int, help='Number of DUTs to collect LLDP info from in parallel. With the async collector, this is the number of requests in flight unless --eapi-concurrency is given (default = 1)')
+	parser.add_argument('--collector', choices=['swat','eapi','async'], default='swat', help="Use 'eapi' to get lldp neighbors and interface status of a DUT in one eAPI request instead of separate SWAT calls. 'async' sends these requests to all DUTs at once from a single thread (default = swat)")
+	parser.add_argument('--eapi-transport', choices=['https','http'], default='https', help='Transport used by the eapi and async collectors (default = https)')
+	parser.add_argument('--eapi-user', default='admin', help='Username used by the eapi and async collectors (default = admin)')
+	parser.add_argument('--eapi-password', default='', help='Password used by the eapi and async collectors (default = no password)')
+	parser.add_argument('--eapi-concurrency', type=int, help='Number of eAPI requests the async collector keeps in flight (default = --workers if given, else all DUTs at once)')
+	parser.add_argument('--eapi-timeout', type=float, default=30, help='Timeout in seconds for each eAPI request of the async collector (default = 30)')
+	parser.add_argument('--record', metavar='DIR', help='Save the raw lldp and interface data of every DUT in this directory so that it can be replayed later')
+	parser.add_argument('--replay', metavar='DIR', help='Generate the topology from the data saved using --record instead of connecting to the DUTs')
+	parser.add_argument('--cache-ttl', type=float, default=0, help='Reuse the cached lldp info and connected interfaces of a DUT if they are younger than these many seconds (default = 0, cache disabled)')
+	parser.add_argument('--cache-dir', default='~/.topoGen/cache', help='Directory for cached data (default = ~/.topoGen/cache)')
+	parser.add_argument('--inventory-ttl', type=float, default=900, help='Reuse the cached Art inventory of the pool if it is younger than these many seconds. 0 means the inventory is always fetched (default = 900)')
+	parser.add_argument('--refresh', nargs='+', default=[], help='Ignore the cached lldp info and connected interfaces of the following DUTs and get them from the DUTs again')
+	parser.add_argument('--headless', action='store_true', help="Only render the graph to a file. The PDF and OmniGraffle are not opened and nothing is asked (for running from cron)")
+	parser.add_argument('--no-render-cache', dest='renderCache', action='store_false', help="Add this flag if you DON'T want an unchanged topology to reuse the previously rendered file from the cache directory (default = reused)")
+	parser.add_argument('--formats', default='pdf', help='Comma separated list of formats to render the graph in. Eg) pdf,svg,png. The formats are rendered in parallel (default = pdf)')
+	parser.add_argument('--engine', choices=['auto','dot','neato','fdp','sfdp','circo','twopi'], default='auto', help="Graphviz layout engine. 'auto' uses dot for small labs and neato/sfdp for labs with hundreds of DUTs (default = auto)")
+	parser.add_argument('--render-timeout', type=float, default=300, help='Seconds after which rendering is retried using a faster layout engine. 0 means no timeout (default = 300)')
+	parser.add_argument('--partition', choices=['component','owner'], help="Render one graph per group of connected DUTs ('component') or per DUT owner as per Art ('owner') in parallel, along with TopologyIndex.html linking them")
+	parser.add_argument('--focus', metavar='DUT', help='Generate the topology only around this DUT. Only the DUTs within --hops hops of it are polled')
+	parser.add_argument('--hops', type=int, default=1, help='Number of hops around the --focus DUT to include (default = 1)')
+	parser.add_argument('--discover', nargs='+', metavar='SEED', help='Discover the DUTs starting from these DUTs by following their lldp neighbors. Without -u/-f, any DUT seen in lldp can be polled')
+	parser.add_argument('--max-depth', type=int, help='Number of hops from the --discover seeds after which discovery stops (default = no limit)')
+	parser.add_argument('--hostname-regex', nargs='+', metavar='PATTERN', help="Regex used to find the DUT name in the lldp system names, tried in order. If a pattern has a group, the first group is the DUT name. Eg) '([a-z]+[0-9]+)-mgmt' (default = two letters followed by three digits)")
+	parser.add_argument('--timings', metavar='FILE', help='Write the wall time, CPU time and peak memory allocated by every stage (inventory, collection, dedup, ixia, consolidation, text, dot, render) and the collection time of every DUT to this JSON file')
+	parser.add_argument('--profile', metavar='FILE', help='Run the script under cProfile and write the profile to this file (readable using pstats or snakeviz). Also records the --timings. Memory is not traced unless --timings is given too, since tracing distorts the profile')
+	parser.add_argument('--levels', metavar='FILE', help="YAML/JSON/CSV file with the leaf-spine level of every device (1 being lowest), or 'auto' to infer the levels from the connections. The graph is generated with these levels without asking")
+	parser.add_argument('--levels-regex', nargs='+', metavar='RULE', help="Regex rules for leaf-spine levels of devices not in the level file. Eg) '^lf=1' '^fm=2'")
 	options = parser.parse_args()
 
     # Logging
 	logOptions['logLevel'] = logOptions['logLevel']
 	logLib.Config(**logOptions)
 
-	mainFunc(options.user, options.pool, options.file, options.graph, options.ifNames, options.exclude, options.ixia, options.consolidation)
+	cacheOptions={'cacheDir':os.path.expanduser(options.cache_dir), 'cacheTtl':options.cache_ttl, 'refreshDuts':options.refresh, 'inventoryTtl':options.inventory_ttl}
+	eapiOptions={'eapiTransport':options.eapi_transport, 'eapiUser':options.eapi_user, 'eapiPassword':options.eapi_password, 'eapiTimeout':options.eapi_timeout, 'eapiConcurrency':options.eapi_concurrency or options.workers or 0}
+
+	profiler=None
+	if options.timings or options.profile:
+		startTimings(traceMemory=bool(options.timings))
+	if options.profile:
+		profiler=cProfile.Profile()
+		profiler.enable()
+
+	#The timings and profile are written even when the script ends using abort()
+	try:
+		mainFunc(options.user, options.pool, options.file, options.graph, options.ifNames, options.exclude, options.ixia, options.consolidation, options.workers or 1, options.collector, eapiOptions, options.record, options.replay, cacheOptions, options.levels, options.levels_regex, options.headless, options.renderCache, options.formats.split(','), options.engine, options.render_timeout, options.partition, options.focus, options.hops, options.discover, options.max_depth, options.all_owners, options.hostname_regex)
+	finally:
+		if profiler:
+			profiler.disable()
+			profiler.dump_stats(options.profile)
+			logging.info(" > Profile written to "+options.profile)
+		if options.timings or options.profile:
+			writeTimingReport(options.timings or os.path.splitext(options.profile)[0]+'-timings.json')